@@ -0,0 +1,51 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from api.metrics import cache_access
+from api_yamdb.settings import TOKEN_ROLE_CLAIMS
+from reviews.models import ClaimsUser
+from reviews.user_cache import cache_user, get_cached_user, get_token_version
+
+CLAIMS = ('username', 'role', 'is_staff')
+VERSION_CLAIM = 'ver'
+
+
+def add_role_claims(token, user):
+    """Добавляет в токен роль и версию прав, если это включено."""
+    if TOKEN_ROLE_CLAIMS:
+        for claim in CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без запроса к таблице пользователей.
+
+    Токен с ролью даёт пользователя прямо из утверждений, если версия
+    прав в нём совпадает с текущей; иначе пользователь берётся из кэша
+    или, при промахе, из БД.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        user = self.get_claims_user(user_id, validated_token)
+        if user is not None:
+            return user
+        user = get_cached_user(user_id)
+        cache_access('users', user is not None)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(user)
+        return user
+
+    def get_claims_user(self, user_id, validated_token):
+        version = validated_token.get(VERSION_CLAIM)
+        if version is None or version != get_token_version(user_id):
+            return None
+        return ClaimsUser(
+            pk=user_id,
+            **{claim: validated_token[claim] for claim in CLAIMS}
+        )
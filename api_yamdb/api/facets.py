@@ -0,0 +1,84 @@
+"""Счётчики фасетов для списка произведений: ?facets=1."""
+from django.core.cache import cache
+from django.db.models import Count
+
+from api.metrics import cache_access
+from api_yamdb.settings import (FACET_YEAR_BUCKET, FACETS_CACHE_TIMEOUT,
+                                TITLE_BITMAP_INDEX)
+from reviews.title_index import title_index
+
+FACETS_PARAM = 'facets'
+NOT_FILTER_PARAMS = (FACETS_PARAM, 'page', 'cursor', 'pagination',
+                     'ordering')
+MULTI_VALUE_PARAMS = ('genre', 'category')
+
+
+def normalize_filter(query_params):
+    """Параметры фильтра в каноническом виде для ключа кэша."""
+    items = []
+    for name in sorted(query_params):
+        if name in NOT_FILTER_PARAMS:
+            continue
+        for value in sorted(query_params.getlist(name)):
+            if name in MULTI_VALUE_PARAMS:
+                value = ','.join(sorted(set(value.split(','))))
+            items.append(f'{name}={value}')
+    return '&'.join(items)
+
+
+def format_facets(genres, categories, years):
+    return {
+        'genre': {slug: count for slug, count in genres if count},
+        'category': {slug: count for slug, count in categories if count},
+        'year': {
+            str(bucket): count for bucket, count in sorted(years) if count
+        },
+    }
+
+
+def bitmap_facets(queryset):
+    bits = 0
+    for title_id in queryset.order_by().values_list('pk', flat=True):
+        bits |= 1 << title_id
+    genres, categories, years = title_index.facet_counts(
+        bits, FACET_YEAR_BUCKET
+    )
+    return format_facets(genres.items(), categories.items(), years.items())
+
+
+def sql_facets(queryset):
+    queryset = queryset.order_by()
+    genres = queryset.filter(genre__isnull=False).values_list(
+        'genre__slug'
+    ).annotate(count=Count('pk', distinct=True))
+    categories = queryset.filter(category__isnull=False).values_list(
+        'category__slug'
+    ).annotate(count=Count('pk'))
+    years = {}
+    for year, count in queryset.values_list('year').annotate(
+        count=Count('pk')
+    ):
+        bucket = year - year % FACET_YEAR_BUCKET
+        years[bucket] = years.get(bucket, 0) + count
+    return format_facets(genres, categories, years.items())
+
+
+def get_title_facets(queryset, query_params):
+    """Фасеты для отфильтрованного queryset.
+
+    С битовым индексом берётся один список id, остальное считается
+    в памяти; результат кэшируется по фильтру и версии индекса.
+    """
+    if not TITLE_BITMAP_INDEX:
+        return sql_facets(queryset)
+    title_index.ensure_fresh()
+    key = (
+        f'title-facets:{title_index.version}:'
+        f'{normalize_filter(query_params)}'
+    )
+    facets = cache.get(key)
+    cache_access('facets', facets is not None)
+    if facets is None:
+        facets = bitmap_facets(queryset)
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
@@ -1,6 +1,60 @@
+import json
+
+from django.db import connection
+from django.db.models import Q
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from api_yamdb.settings import TITLE_BITMAP_INDEX
+from reviews.models import Category, GenreTitle, Title
+from reviews.search import (TITLE_SEARCH_TABLE, build_match_query,
+                            search_available)
+from reviews.title_index import ALL, ANY, bits_to_ids, title_index
+
+BITMAP_FILTERS = ('genre', 'genre_mode', 'category', 'year', 'year_min',
+                  'year_max')
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+def slug_lookup(lookup, value, field='slug'):
+    """Условие на slug, которое может использовать уникальный индекс.
+
+    Префикс ищется диапазоном, а не LIKE: в SQLite LIKE без учёта
+    регистра не использует индекс.
+    """
+    if lookup == 'in':
+        return Q(**{f'{field}__in': value})
+    if lookup == 'prefix':
+        return Q(**{
+            f'{field}__gte': value,
+            f'{field}__lt': value + PREFIX_UPPER_BOUND,
+        })
+    return Q(**{f'{field}__contains': value})
+
+
+def titles_with_genre(condition):
+    """Полусоединение через GenreTitle: строки произведений не дублируются."""
+    return Q(pk__in=GenreTitle.objects.filter(condition).values('title_id'))
+
+
+def filter_ids(queryset, ids):
+    """Фильтр по списку id одним параметром запроса.
+
+    В SQLite список передаётся как JSON в json_each, поэтому длина
+    списка не упирается в лимит числа параметров.
+    """
+    if connection.vendor != 'sqlite':
+        return queryset.filter(pk__in=ids)
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        where=[f'{table}.id IN (SELECT value FROM json_each(%s))'],
+        params=[json.dumps(ids)],
+    )
+
 
-from reviews.models import Title
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
 
 
 class TitleFilter(filters.FilterSet):
@@ -8,17 +62,104 @@ class TitleFilter(filters.FilterSet):
         field_name='name',
         lookup_expr='contains'
     )
-    category = filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='contains'
-
-    )
-    genre = filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='contains'
+    category = CharInFilter(method='filter_category')
+    category_prefix = filters.CharFilter(method='filter_category')
+    category_contains = filters.CharFilter(method='filter_category')
+    genre = CharInFilter(method='filter_genre')
+    genre_mode = filters.ChoiceFilter(
+        choices=((ANY, 'Любой из жанров'), (ALL, 'Все жанры')),
+        method='filter_nothing'
     )
+    genre_prefix = filters.CharFilter(method='filter_genre')
+    genre_contains = filters.CharFilter(method='filter_genre')
     year = filters.NumberFilter()
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
 
     class Meta:
         model = Title
         fields = ('name', 'genre', 'category', 'year',)
+
+    @staticmethod
+    def get_lookup(name):
+        if name.endswith('_prefix'):
+            return 'prefix'
+        if name.endswith('_contains'):
+            return 'contains'
+        return 'in'
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(category__in=Category.objects.filter(
+            slug_lookup(self.get_lookup(name), value)
+        ))
+
+    def filter_genre(self, queryset, name, value):
+        lookup = self.get_lookup(name)
+        if lookup == 'in' and self.form.cleaned_data.get('genre_mode') == ALL:
+            for slug in set(value):
+                queryset = queryset.filter(
+                    titles_with_genre(Q(genre__slug=slug))
+                )
+            return queryset
+        return queryset.filter(titles_with_genre(
+            slug_lookup(lookup, value, field='genre__slug')
+        ))
+
+    def filter_nothing(self, queryset, name, value):
+        return queryset
+
+    def filter_queryset(self, queryset):
+        """Жанры, категории и годы отбираются по битовому индексу,
+        остальные фильтры применяются как обычно."""
+        data = self.form.cleaned_data
+        if TITLE_BITMAP_INDEX and any(
+            data.get(name) not in (None, '', [])
+            for name in BITMAP_FILTERS if name != 'genre_mode'
+        ):
+            bits = title_index.match(
+                genres=data.get('genre') or (),
+                genre_mode=data.get('genre_mode') or ANY,
+                categories=data.get('category') or (),
+                year=data.get('year'),
+                year_min=data.get('year_min'),
+                year_max=data.get('year_max'),
+            )
+            queryset = filter_ids(queryset, bits_to_ids(bits))
+            data = {
+                name: value for name, value in data.items()
+                if name not in BITMAP_FILTERS
+            }
+        for name, value in data.items():
+            queryset = self.filters[name].filter(queryset, value)
+        return queryset
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по названию и описанию: ?search=.
+
+    Без явного ?ordering= результаты упорядочены по релевантности.
+    Если FTS5 недоступен, ищет через icontains.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        match = build_match_query(text)
+        if not match:
+            return queryset
+        if not search_available(connection):
+            return queryset.filter(
+                Q(name__icontains=text) | Q(description__icontains=text)
+            )
+        queryset = queryset.extra(
+            select={'search_rank': f'{TITLE_SEARCH_TABLE}.rank'},
+            tables=[TITLE_SEARCH_TABLE],
+            where=[
+                f'{TITLE_SEARCH_TABLE} MATCH %s',
+                f'{TITLE_SEARCH_TABLE}.rowid = {Title._meta.db_table}.id',
+            ],
+            params=[match],
+        )
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            queryset = queryset.order_by('search_rank', 'id')
+        return queryset
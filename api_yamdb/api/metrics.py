@@ -0,0 +1,299 @@
+"""Метрики в текстовом формате Prometheus, общие для процессов на хосте.
+
+Каждый процесс пишет свои значения в отдельный файл METRICS_DIR/<pid>.db,
+отображённый в память через mmap. Файл состоит из заголовка с числом
+занятых байт и записей «длина ключа, ключ, значение double»; ключом
+служит строка сэмпла вида name{label="value"}. Писатель у файла один,
+поэтому блокировки между процессами не нужны. При выдаче /metrics файлы
+всех процессов читаются и суммируются. Счётчики завершённых процессов
+сливаются под блокировкой в один файл AGGREGATE, а файлы процессов
+удаляются, поэтому каталог не растёт; gauge завершённых процессов
+отбрасываются.
+"""
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.core.files import locks
+from django.dispatch import receiver
+
+from api_yamdb.settings import METRICS, METRICS_DIR
+from reviews.title_index import index_checked
+
+HEADER = struct.Struct('<I4x')
+LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+INITIAL_SIZE = 64 * 1024
+AGGREGATE = 'aggregate.db'
+LOCK = 'lock'
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf')
+)
+
+FAMILIES = {
+    'yamdb_http_requests_total': (
+        COUNTER, 'Запросы к API по маршруту, действию и статусу'
+    ),
+    'yamdb_http_request_duration_seconds': (
+        HISTOGRAM, 'Время обработки запроса'
+    ),
+    'yamdb_http_requests_in_flight': (
+        GAUGE, 'Запросы, обрабатываемые сейчас'
+    ),
+    'yamdb_db_queries_total': (
+        COUNTER, 'SQL-запросы по маршруту и действию'
+    ),
+    'yamdb_db_query_duration_seconds_total': (
+        COUNTER, 'Суммарное время SQL-запросов'
+    ),
+    'yamdb_cache_requests_total': (
+        COUNTER, 'Обращения к кэшам приложения: hit или miss'
+    ),
+}
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('\n', '\\n')
+        .replace('"', '\\"')
+    )
+
+
+def format_float(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def sample_key(name, labels):
+    if not labels:
+        return name
+    pairs = ','.join(
+        f'{label}="{escape(value)}"' for label, value in labels.items()
+    )
+    return f'{name}{{{pairs}}}'
+
+
+def family_name(key):
+    name = key.split('{', 1)[0]
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def read_file(path):
+    """Пары (ключ, значение) из файла процесса."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        return
+    used = HEADER.unpack_from(data)[0]
+    position = HEADER.size
+    while position < used:
+        length = LENGTH.unpack_from(data, position)[0]
+        start = position + LENGTH.size
+        key = data[start:start + length].decode()
+        position = start + length + (-(LENGTH.size + length) % 8)
+        yield key, VALUE.unpack_from(data, position)[0]
+        position += VALUE.size
+
+
+def write_file(path, values):
+    """Записывает пары (ключ, значение) в формате файла процесса."""
+    data = bytearray(HEADER.size)
+    for key, value in values.items():
+        encoded = key.encode()
+        data += LENGTH.pack(len(encoded)) + encoded
+        data += bytes(-(LENGTH.size + len(encoded)) % 8)
+        data += VALUE.pack(value)
+    HEADER.pack_into(data, 0, len(data))
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def is_gauge(key):
+    return FAMILIES.get(family_name(key), (None,))[0] == GAUGE
+
+
+def process_files(directory):
+    """Файлы процессов: {pid: путь}."""
+    files = {}
+    for file_name in os.listdir(directory):
+        pid, extension = os.path.splitext(file_name)
+        if extension == '.db' and pid.isdigit():
+            files[int(pid)] = os.path.join(directory, file_name)
+    return files
+
+
+def read_values(path):
+    try:
+        return list(read_file(path))
+    except FileNotFoundError:
+        return []
+
+
+def compact(directory):
+    """Сливает счётчики завершённых процессов в AGGREGATE и удаляет
+    их файлы; вызывается под блокировкой каталога."""
+    dead = [
+        path for pid, path in process_files(directory).items()
+        if not process_alive(pid)
+    ]
+    if not dead:
+        return
+    aggregate = os.path.join(directory, AGGREGATE)
+    totals = defaultdict(float, read_values(aggregate))
+    for path in dead:
+        for key, value in read_values(path):
+            if not is_gauge(key):
+                totals[key] += value
+    write_file(aggregate, totals)
+    for path in dead:
+        os.remove(path)
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MmapStore:
+    """Значения метрик текущего процесса."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def open(self):
+        """Файл открывается заново после fork, чтобы у каждого
+        процесса был свой."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.pid = os.getpid()
+        self.path = os.path.join(self.directory, f'{self.pid}.db')
+        self.file = open(self.path, 'a+b')
+        if os.path.getsize(self.path) < INITIAL_SIZE:
+            self.file.truncate(INITIAL_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.used = HEADER.unpack_from(self.map)[0] or HEADER.size
+        self.positions = {}
+        position = HEADER.size
+        while position < self.used:
+            length = LENGTH.unpack_from(self.map, position)[0]
+            start = position + LENGTH.size
+            key = self.map[start:start + length].decode()
+            position = start + length + (-(LENGTH.size + length) % 8)
+            self.positions[key] = position
+            position += VALUE.size
+
+    def position(self, key):
+        position = self.positions.get(key)
+        if position is not None:
+            return position
+        encoded = key.encode()
+        padding = -(LENGTH.size + len(encoded)) % 8
+        size = LENGTH.size + len(encoded) + padding + VALUE.size
+        while self.used + size > len(self.map):
+            self.map.resize(len(self.map) * 2)
+        LENGTH.pack_into(self.map, self.used, len(encoded))
+        start = self.used + LENGTH.size
+        self.map[start:start + len(encoded)] = encoded
+        position = start + len(encoded) + padding
+        VALUE.pack_into(self.map, position, 0.0)
+        self.used += size
+        HEADER.pack_into(self.map, 0, self.used)
+        self.positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.open()
+            position = self.position(key)
+            value = VALUE.unpack_from(self.map, position)[0]
+            VALUE.pack_into(self.map, position, value + amount)
+
+
+store = MmapStore(METRICS_DIR)
+
+
+def inc(name, labels=None, amount=1):
+    if METRICS:
+        store.add(sample_key(name, labels), amount)
+
+
+def observe(name, labels, value, buckets=LATENCY_BUCKETS):
+    for bound in buckets:
+        if value <= bound:
+            inc(f'{name}_bucket', {**labels, 'le': format_float(bound)})
+    inc(f'{name}_sum', labels, value)
+    inc(f'{name}_count', labels)
+
+
+def cache_access(cache, hit):
+    inc('yamdb_cache_requests_total',
+        {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+
+@receiver(index_checked)
+def title_index_checked(sender, fresh, **kwargs):
+    cache_access('title_index', fresh)
+
+
+def sort_key(key):
+    """Корзины гистограммы по возрастанию границы."""
+    head, separator, bound = key.partition('le="')
+    if not separator:
+        return key, 0.0
+    bound, _, tail = bound.partition('"')
+    return head + tail, float(bound.replace('+Inf', 'inf'))
+
+
+def collect(directory=None):
+    """Сумма значений по файлам всех процессов; по умолчанию
+    из каталога store."""
+    if directory is None:
+        directory = store.directory
+    totals = defaultdict(float)
+    if not os.path.isdir(directory):
+        return totals
+    with open(os.path.join(directory, LOCK), 'ab') as lock:
+        locks.lock(lock, locks.LOCK_EX)
+        compact(directory)
+        paths = [os.path.join(directory, AGGREGATE)]
+        paths += process_files(directory).values()
+        for path in paths:
+            for key, value in read_values(path):
+                totals[key] += value
+    return totals
+
+
+def exposition():
+    """Текст для /metrics."""
+    families = defaultdict(list)
+    for key, value in sorted(
+        collect().items(), key=lambda item: sort_key(item[0])
+    ):
+        families[family_name(key)].append((key, value))
+    lines = []
+    for name, (kind, description) in FAMILIES.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in families.get(name, ()):
+            lines.append(f'{key} {format_float(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,240 @@
+"""Счётчики SQL-запросов по маршрутам API и журнал медленных запросов.
+
+Запросы считаются обёрткой connection.execute_wrapper и не требуют DEBUG.
+Сводка по парам (маршрут, действие) хранится в памяти процесса и
+ограничена SQL_STATS_MAX_ROUTES: при переполнении вытесняется маршрут,
+к которому дольше всего не обращались. Медленные запросы записывает
+та же обёртка в SqlStatsMiddleware, поэтому журнал не зависит
+от SQL_STATS.
+"""
+import hmac
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import AuthenticationFailed
+
+from api import metrics
+from api.authentication import CachedJWTAuthentication
+from api.profiling import sampler
+from api.slow_queries import slow_query_log
+from api_yamdb.settings import (METRICS, PROFILE_HEADER, PROFILE_ROUTES,
+                                PROFILE_SAMPLE_RATE, PROFILE_SECRET,
+                                PROFILING, SQL_STATS, SQL_STATS_HEADERS,
+                                SQL_STATS_MAX_ROUTES)
+
+QUERIES_HEADER = 'X-SQL-Queries'
+TIME_HEADER = 'X-SQL-Time-Ms'
+UNRESOLVED_ROUTE = '<unresolved>'
+
+
+class QueryCounter:
+    """Обёртка выполнения запросов: число и суммарное время.
+
+    Если передан request, медленные запросы попадают в журнал
+    с маршрутом, по которому они выполнены.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if slow_query_log.explaining:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.duration += duration
+            self.count += 1
+        if self.request is not None and slow_query_log.is_slow(duration):
+            route, action = route_key(self.request)
+            match = getattr(self.request, 'resolver_match', None)
+            slow_query_log.capture(
+                context['connection'], sql, params, many, duration,
+                route, action, match and match.view_name
+            )
+        return result
+
+
+class RouteSqlStats:
+
+    def __init__(self, max_routes):
+        self.max_routes = max_routes
+        self.lock = threading.Lock()
+        self.routes = OrderedDict()
+
+    def add(self, key, queries, sql_time, duration):
+        with self.lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                if len(self.routes) >= self.max_routes:
+                    self.routes.popitem(last=False)
+                stats = self.routes[key] = {
+                    'requests': 0,
+                    'queries': 0,
+                    'max_queries': 0,
+                    'sql_time': 0.0,
+                    'duration': 0.0,
+                }
+            else:
+                self.routes.move_to_end(key)
+            stats['requests'] += 1
+            stats['queries'] += queries
+            stats['max_queries'] = max(stats['max_queries'], queries)
+            stats['sql_time'] += sql_time
+            stats['duration'] += duration
+
+    def summary(self):
+        """Маршруты по убыванию суммарного времени в БД."""
+        with self.lock:
+            routes = [
+                (key, dict(stats)) for key, stats in self.routes.items()
+            ]
+        result = []
+        for (route, action), stats in routes:
+            requests = stats['requests']
+            result.append({
+                'route': route,
+                'action': action,
+                'requests': requests,
+                'queries': stats['queries'],
+                'avg_queries': round(stats['queries'] / requests, 2),
+                'max_queries': stats['max_queries'],
+                'sql_ms': round(stats['sql_time'] * 1000, 3),
+                'avg_sql_ms': round(stats['sql_time'] * 1000 / requests, 3),
+                'avg_ms': round(stats['duration'] * 1000 / requests, 3),
+            })
+        result.sort(key=lambda route: route['sql_ms'], reverse=True)
+        return result
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+
+
+sql_stats = RouteSqlStats(SQL_STATS_MAX_ROUTES)
+
+
+def route_key(request):
+    """Шаблон маршрута и действие вьюсета или HTTP-метод."""
+    match = getattr(request, 'resolver_match', None)
+    method = request.method.lower()
+    if match is None:
+        return UNRESOLVED_ROUTE, method
+    actions = getattr(match.func, 'actions', None) or {}
+    return match.route.rstrip('$'), actions.get(method, method)
+
+
+class SqlStatsMiddleware:
+    """Сводка SQL_STATS и журнал медленных запросов: журнал ведётся
+    и с выключенной сводкой, если задан SLOW_QUERY_THRESHOLD_MS."""
+
+    def __init__(self, get_response):
+        if not SQL_STATS and slow_query_log.threshold is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter(request)
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        if not SQL_STATS:
+            return response
+        sql_stats.add(
+            route_key(request), counter.count, counter.duration,
+            time.perf_counter() - started
+        )
+        if SQL_STATS_HEADERS:
+            response[QUERIES_HEADER] = str(counter.count)
+            response[TIME_HEADER] = f'{counter.duration * 1000:.3f}'
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует долю PROFILE_SAMPLE_RATE запросов, а также запросы
+    к маршрутам из PROFILE_ROUTES и с заголовком PROFILE_HEADER
+    от администратора или со значением PROFILE_SECRET."""
+
+    def __init__(self, get_response):
+        if not PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + PROFILE_HEADER.upper().replace('-', '_')
+
+    def header_allowed(self, request):
+        value = request.META.get(self.header)
+        if not value:
+            return False
+        if PROFILE_SECRET and hmac.compare_digest(
+            value.encode(), PROFILE_SECRET.encode()
+        ):
+            return True
+        try:
+            authenticated = CachedJWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return authenticated is not None and authenticated[0].is_admin
+
+    def profiled(self, request):
+        if self.header_allowed(request):
+            return True
+        if random.random() < PROFILE_SAMPLE_RATE:
+            return True
+        if PROFILE_ROUTES:
+            try:
+                route = resolve(request.path_info).route.rstrip('$')
+            except Resolver404:
+                return False
+            return route in PROFILE_ROUTES
+        return False
+
+    def __call__(self, request):
+        if not self.profiled(request):
+            return self.get_response(request)
+        sampler.start()
+        try:
+            return self.get_response(request)
+        finally:
+            sampler.stop(route_key(request))
+
+
+class MetricsMiddleware:
+    """Счётчики и гистограммы для /metrics с метками view и action."""
+
+    def __init__(self, get_response):
+        if not METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        metrics.inc('yamdb_http_requests_in_flight')
+        try:
+            with connection.execute_wrapper(counter):
+                response = self.get_response(request)
+        finally:
+            metrics.inc('yamdb_http_requests_in_flight', amount=-1)
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        labels = {
+            'view': match.view_name if match else UNRESOLVED_ROUTE,
+            'action': route_key(request)[1],
+        }
+        metrics.inc('yamdb_http_requests_total',
+                    {**labels, 'status': response.status_code})
+        metrics.observe('yamdb_http_request_duration_seconds', labels,
+                        duration)
+        metrics.inc('yamdb_db_queries_total', labels, counter.count)
+        metrics.inc('yamdb_db_query_duration_seconds_total', labels,
+                    counter.duration)
+        return response
@@ -0,0 +1,262 @@
+import json
+import math
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from api_yamdb.settings import CURSOR_PAGINATION
+
+CURSOR_QUERY_PARAM = 'cursor'
+PAGINATION_QUERY_PARAM = 'pagination'
+INVALID_CURSOR_MESSAGE = 'Неверный курсор пагинации.'
+INVALID_ORDERING_MESSAGE = (
+    'Курсорная пагинация не поддерживает сортировку по полю {}.'
+)
+
+
+def encode_value(value):
+    """Даты хранятся с микросекундами, чтобы курсор совпадал со значением
+    в БД."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} нельзя сохранить в курсоре')
+
+
+def invert_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith('-') else f'-{field}'
+        for field in ordering
+    )
+
+
+def seek_filter(name, value, descending, nullable):
+    """Условие «строго после value» для одного поля.
+
+    NULL считается меньше любого значения, как при сортировке в SQLite.
+    """
+    if value is None:
+        if descending:
+            return Q(pk__in=[])
+        return Q(**{f'{name}__isnull': False})
+    condition = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+    if descending and nullable:
+        condition |= Q(**{f'{name}__isnull': True})
+    return condition
+
+
+def keyset_filter(ordering, values, nullable=()):
+    """Условие «строго после» позиции для составного ключа сортировки.
+
+    Для ('-pub_date', '-id') строится
+    pub_date <= v1 AND (pub_date < v1 OR (pub_date = v1 AND id < v2)).
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        condition |= equal & seek_filter(
+            name, value, field.startswith('-'), name in nullable
+        )
+        equal &= Q(**{name: value})
+    return leading_bound(ordering[0], values[0], nullable) & condition
+
+
+def leading_bound(field, value, nullable):
+    """Избыточная граница по первому полю: с ней БД ищет начало страницы
+    по индексу, а не сканирует его с начала."""
+    name = field.lstrip('-')
+    if value is None:
+        return Q(**{f'{name}__isnull': True}) if field.startswith('-') else Q()
+    if not field.startswith('-'):
+        return Q(**{f'{name}__gte': value})
+    bound = Q(**{f'{name}__lte': value})
+    if name in nullable:
+        bound |= Q(**{f'{name}__isnull': True})
+    return bound
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по курсору без OFFSET и COUNT(*).
+
+    Курсор хранит значения полей сортировки последней (или первой)
+    записи страницы, следующая страница выбирается условием по ним.
+    Последнее поле сортировки должно быть уникальным (обычно id).
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = CURSOR_QUERY_PARAM
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        values, reverse = self.decode_cursor(request, queryset.model)
+        ordering = invert_ordering(self.ordering) if reverse else (
+            self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            nullable = {
+                field.name for field in queryset.model._meta.concrete_fields
+                if field.null
+            }
+            queryset = queryset.filter(
+                keyset_filter(ordering, values, nullable)
+            )
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+        self.has_next = has_more if not reverse else values is not None
+        self.has_previous = has_more if reverse else values is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_position(self, instance):
+        return [
+            getattr(instance, field.lstrip('-')) for field in self.ordering
+        ]
+
+    def encode_cursor(self, instance, reverse):
+        payload = {'v': self.get_position(instance)}
+        if reverse:
+            payload['r'] = 1
+        cursor = urlsafe_b64encode(
+            json.dumps(payload, default=encode_value).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, request, model):
+        """Значения курсора, приведённые к типам полей сортировки:
+        подделанный курсор даёт 404, а не ошибку в запросе к БД."""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(cursor.encode()))
+            values = payload['v']
+            reverse = bool(payload.get('r'))
+        except (BinasciiError, KeyError, TypeError, ValueError):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+        try:
+            values = [
+                self.cursor_value(model, field.lstrip('-'), value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(INVALID_CURSOR_MESSAGE)
+        return values, reverse
+
+    @staticmethod
+    def cursor_value(model, name, value):
+        """Значение поля name из курсора; None допустим только для
+        полей с null=True (например, rating произведения)."""
+        if isinstance(value, (list, dict)):
+            raise TypeError(f'{name}: в курсоре ожидается скаляр')
+        field = model._meta.get_field(name)
+        if value is None:
+            if not field.null:
+                raise ValueError(f'{name}: пустое значение в курсоре')
+            return None
+        value = field.to_python(value)
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f'{name}: в курсоре ожидается число')
+        return value
+
+
+class PubDateCursorPagination(KeysetPagination):
+    ordering = ('-pub_date', '-id')
+
+
+class TitleCursorPagination(KeysetPagination):
+    """Курсор по сортировке из ?ordering=, последним ключом идёт id."""
+    ordering = ('name', 'id')
+    ordering_fields = ('name', 'year', 'rating', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(
+            OrderingFilter().get_ordering(request, queryset, view)
+            or self.ordering
+        )
+        names = [field.lstrip('-') for field in ordering]
+        for name in names:
+            if name not in self.ordering_fields:
+                raise ValidationError(
+                    {'ordering': INVALID_ORDERING_MESSAGE.format(name)}
+                )
+        if 'id' in names:
+            return tuple(ordering[:names.index('id') + 1])
+        ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return tuple(ordering)
+
+
+def cursor_requested(request):
+    mode = request.query_params.get(PAGINATION_QUERY_PARAM)
+    if mode:
+        return mode == 'cursor'
+    return (
+        CURSOR_PAGINATION
+        or CURSOR_QUERY_PARAM in request.query_params
+    )
+
+
+class SwitchablePagination(BasePagination):
+    """Постраничная пагинация или курсорная по ?pagination=cursor."""
+    page_pagination_class = PageNumberPagination
+    cursor_pagination_class = PubDateCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if cursor_requested(request):
+            self.paginator = self.cursor_pagination_class()
+        else:
+            self.paginator = self.page_pagination_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+
+class TitlePagination(SwitchablePagination):
+    cursor_pagination_class = TitleCursorPagination
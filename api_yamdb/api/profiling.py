@@ -0,0 +1,122 @@
+"""Выборочное профилирование запросов снятием стеков.
+
+Один фоновый поток раз в PROFILE_INTERVAL_MS снимает стеки потоков,
+которые сейчас обрабатывают профилируемые запросы. Стеки копятся
+в свёрнутом формате («функция;функция;функция число»), который
+принимают flamegraph.pl, speedscope и inferno, и группируются
+по маршруту и действию вьюсета.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+
+from api_yamdb.settings import PROFILE_INTERVAL_MS, PROFILE_MAX_STACKS
+
+TRUNCATED_STACK = '[truncated]'
+
+
+def frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}.{getattr(code, "co_qualname", code.co_name)}'
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+
+    def __init__(self, interval_ms, max_stacks):
+        self.interval = interval_ms / 1000
+        self.max_stacks = max_stacks
+        self.lock = threading.Lock()
+        self.active = {}
+        self.profiles = {}
+        self.thread = None
+        self.wake = threading.Event()
+
+    def ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(
+                target=self.run, name='stack-sampler', daemon=True
+            )
+            self.thread.start()
+
+    def start(self):
+        """Начинает снимать стеки текущего потока."""
+        with self.lock:
+            self.active[threading.get_ident()] = Counter()
+            self.ensure_thread()
+            self.wake.set()
+
+    def stop(self, key):
+        """Прекращает снимать стеки текущего потока и добавляет
+        их в профиль key."""
+        with self.lock:
+            samples = self.active.pop(threading.get_ident(), None)
+            if samples is None:
+                return
+            profile = self.profiles.setdefault(
+                key, {'requests': 0, 'stacks': Counter()}
+            )
+            profile['requests'] += 1
+            stacks = profile['stacks']
+            for stack, count in samples.items():
+                if stack not in stacks and len(stacks) >= self.max_stacks:
+                    stack = TRUNCATED_STACK
+                stacks[stack] += count
+
+    def sample(self):
+        frames = sys._current_frames()
+        with self.lock:
+            for thread_id, samples in self.active.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[collapse(frame)] += 1
+
+    def run(self):
+        """Без профилируемых запросов поток спит до следующего start()."""
+        while True:
+            self.wake.wait()
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    self.wake.clear()
+                    continue
+            self.sample()
+
+    def summary(self):
+        with self.lock:
+            return [
+                {
+                    'route': route,
+                    'action': action,
+                    'requests': profile['requests'],
+                    'samples': sum(profile['stacks'].values()),
+                }
+                for (route, action), profile in self.profiles.items()
+            ]
+
+    def collapsed(self, key):
+        """Профиль key в свёрнутом формате или None."""
+        with self.lock:
+            profile = self.profiles.get(key)
+            if profile is None:
+                return None
+            return ''.join(
+                f'{stack} {count}\n'
+                for stack, count in profile['stacks'].most_common()
+            )
+
+    def reset(self):
+        with self.lock:
+            self.profiles.clear()
+
+
+sampler = StackSampler(PROFILE_INTERVAL_MS, PROFILE_MAX_STACKS)
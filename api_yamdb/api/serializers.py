@@ -1,8 +1,9 @@
-from django.shortcuts import get_object_or_404
+from django.db import models
 from rest_framework import serializers
 
 from api_yamdb.settings import MAX_LENGTH, MAX_LENGTH_EMAIL
 from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+from reviews.usernames import usernames
 from reviews.validators import validate_username
 
 
@@ -46,40 +47,60 @@ class TitleSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'year', 'description', 'genre', 'category')
 
 
+def loaded_username(instance):
+    """Имя автора, если оно уже загружено вместе с объектом."""
+    username = getattr(instance, 'author_username', None)
+    if username is None and type(instance).author.is_cached(instance):
+        username = instance.author.username
+    return username
+
+
+class AuthorField(serializers.Field):
+    """Имя автора без отдельного запроса пользователя для каждой строки."""
+
+    def __init__(self, **kwargs):
+        kwargs.update(read_only=True, source='*')
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        username = loaded_username(instance)
+        if username is not None:
+            return username
+        return usernames.get_many([instance.author_id]).get(
+            instance.author_id
+        )
+
+
+class AuthorListSerializer(serializers.ListSerializer):
+    """Незагруженные имена авторов страницы берутся из reviews.usernames
+    одним обращением."""
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.Manager) else data)
+        unnamed = [row for row in rows if loaded_username(row) is None]
+        if unnamed:
+            names = usernames.get_many({row.author_id for row in unnamed})
+            for row in unnamed:
+                row.author_username = names.get(row.author_id)
+        return super().to_representation(rows)
+
+
 class ReviewSerializer(serializers.ModelSerializer):
-    author = serializers.SlugRelatedField(
-        read_only=True,
-        slug_field='username'
-    )
+    author = AuthorField()
 
     class Meta:
         fields = ('id', 'text', 'author', 'score', 'pub_date')
         model = Review
-
-    def validate(self, data):
-        request = self.context['request']
-        if (
-            request.method == 'POST'
-            and Review.objects.filter(
-                title=get_object_or_404(
-                    Title,
-                    pk=self.context.get('view').kwargs.get('title_id')
-                ),
-                author=request.user).exists()
-        ):
-            raise serializers.ValidationError('Один автор - один отзыв!')
-        return data
+        list_serializer_class = AuthorListSerializer
 
 
 class CommentSerializer(serializers.ModelSerializer):
-    author = serializers.SlugRelatedField(
-        read_only=True,
-        slug_field='username'
-    )
+    author = AuthorField()
 
     class Meta:
         fields = ('id', 'text', 'author', 'pub_date')
         model = Comment
+        list_serializer_class = AuthorListSerializer
 
 
 class SignUpSerializer(serializers.Serializer):
@@ -0,0 +1,116 @@
+"""Журнал медленных SQL-запросов.
+
+Запрос дольше SLOW_QUERY_THRESHOLD_MS попадает в кольцевой буфер
+последних SLOW_QUERY_BUFFER записей вместе с маршрутом и действием,
+типами параметров вместо значений и планом EXPLAIN QUERY PLAN.
+Если задан SLOW_QUERY_LOG_FILE, записи также пишутся строками JSON
+в ротируемый файл; запись в файл идёт в фоновом потоке
+logging.handlers.QueueListener, запрос ждёт только постановки в очередь.
+"""
+import json
+import logging
+import queue
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from django.db import DatabaseError
+
+from api_yamdb.settings import (SLOW_QUERY_BUFFER, SLOW_QUERY_LOG_BACKUPS,
+                                SLOW_QUERY_LOG_FILE, SLOW_QUERY_LOG_MAX_BYTES,
+                                SLOW_QUERY_THRESHOLD_MS)
+
+logger = logging.getLogger('api.slow_queries')
+
+
+def redact(params):
+    """Значения параметров заменяются их типами."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact_value(value) for key, value in params.items()}
+    return [redact_value(value) for value in params]
+
+
+def redact_value(value):
+    if value is None or isinstance(value, bool):
+        return value
+    return f'<{type(value).__name__}>'
+
+
+class SlowQueryLog:
+
+    def __init__(self, threshold_ms, size):
+        self.threshold = (
+            None if threshold_ms is None else threshold_ms / 1000
+        )
+        self.lock = threading.Lock()
+        self.entries = deque(maxlen=size)
+        self.listener = None
+        self.local = threading.local()
+
+    def open_file(self, path, max_bytes, backups):
+        """Подключает запись в файл через фоновый поток."""
+        records = queue.SimpleQueue()
+        handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding='utf8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.listener = QueueListener(records, handler)
+        self.listener.start()
+        logger.addHandler(QueueHandler(records))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    @property
+    def explaining(self):
+        return getattr(self.local, 'explaining', False)
+
+    def is_slow(self, duration):
+        return self.threshold is not None and duration >= self.threshold
+
+    def explain(self, connection, sql, params):
+        prefix = connection.ops.explain_query_prefix()
+        self.local.explaining = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                return [' '.join(map(str, row)) for row in cursor.fetchall()]
+        except (DatabaseError, NotImplementedError):
+            return None
+        finally:
+            self.local.explaining = False
+
+    def capture(self, connection, sql, params, many, duration, route,
+                action, view):
+        entry = {
+            'time': datetime.now(timezone.utc).isoformat(),
+            'duration_ms': round(duration * 1000, 3),
+            'route': route,
+            'action': action,
+            'view': view,
+            'sql': sql,
+            'params': None if many else redact(params),
+            'plan': None if many else self.explain(connection, sql, params),
+        }
+        with self.lock:
+            self.entries.append(entry)
+        if self.listener is not None:
+            logger.info(json.dumps(entry, ensure_ascii=False))
+
+    def recent(self):
+        """Записи буфера, начиная с последней."""
+        with self.lock:
+            return list(reversed(self.entries))
+
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_BUFFER)
+if SLOW_QUERY_LOG_FILE:
+    slow_query_log.open_file(
+        SLOW_QUERY_LOG_FILE, SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_LOG_BACKUPS
+    )
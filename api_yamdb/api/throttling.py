@@ -0,0 +1,142 @@
+"""Ограничение частоты запросов скользящим окном.
+
+Для каждого ключа (адрес клиента, пользователь, имя пользователя)
+в кэше THROTTLE_CACHE (по умолчанию SHARED_CACHE) хранятся счётчики
+текущего и предыдущего окна.
+Число запросов за последний период оценивается как текущий счётчик
+плюс доля предыдущего, равная непрошедшей части текущего окна.
+Кэш общий для процессов на хосте, поэтому лимит действует на все
+процессы сразу. Проверка идёт до вьюхи: запрос сверх лимита стоит
+одного чтения из кэша и не обращается к БД. Пропускаемый запрос
+атомарно увеличивает счётчики (add и incr) и проверяет их ещё раз:
+если параллельные запросы успели занять лимит, увеличение
+откатывается и запрос отклоняется.
+"""
+import math
+import time
+from collections.abc import Mapping
+
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+from api_yamdb.settings import THROTTLE, THROTTLE_CACHE, THROTTLE_RATES
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60)."""
+    limit, period = rate.split('/')
+    return int(limit), PERIODS[period[0]]
+
+
+def retry_after(limit, period, elapsed, current, previous):
+    """Целые секунды до момента, когда оценка опустится ниже limit;
+    elapsed — прошедшая доля текущего окна."""
+    if current < limit:
+        until = 1 - (limit - current) / previous
+    else:
+        until = 2 - limit / current
+    return max(math.ceil((until - elapsed) * period), 1)
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Лимиты берутся из THROTTLE_RATES по ключам '<scope>_<ключ>'."""
+
+    scope = None
+
+    def __init__(self):
+        self.wait_time = None
+
+    def get_idents(self, request, view):
+        """Словарь {ключ: значение}; запросы без значения не считаются."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        if not THROTTLE:
+            return True
+        now = time.time()
+        counters = []
+        for name, ident in self.get_idents(request, view).items():
+            rate = THROTTLE_RATES.get(f'{self.scope}_{name}')
+            if rate is None or ident is None:
+                continue
+            limit, period = parse_rate(rate)
+            window, elapsed = divmod(now / period, 1)
+            prefix = f'throttle:{self.scope}:{name}:{ident}'
+            counters.append((
+                f'{prefix}:{window:.0f}', f'{prefix}:{window - 1:.0f}',
+                limit, period, elapsed
+            ))
+        if not counters:
+            return True
+        cache = caches[THROTTLE_CACHE]
+        counts = cache.get_many(
+            [key for current, previous, *_ in counters
+             for key in (current, previous)]
+        )
+        if self.rejected(counters, counts):
+            return False
+        self.increment(cache, counters, counts)
+        if self.rejected(counters, counts, taken=1):
+            for current, *_ in counters:
+                cache.decr(current)
+            return False
+        return True
+
+    def increment(self, cache, counters, counts):
+        timeout = 2 * max(period for *_, period, _ in counters)
+        for current, *_ in counters:
+            cache.add(current, 0, timeout)
+            try:
+                counts[current] = cache.incr(current)
+            except ValueError:
+                # запись удалили между add и incr
+                cache.add(current, 1, timeout)
+                counts[current] = 1
+
+    def rejected(self, counters, counts, taken=0):
+        """Превышен ли лимит хотя бы одного ключа без учёта taken
+        запросов, уже добавленных в счётчики; заполняет wait_time."""
+        waits = []
+        for current_key, previous_key, limit, period, elapsed in counters:
+            current = counts.get(current_key, 0) - taken
+            previous = counts.get(previous_key, 0)
+            if previous * (1 - elapsed) + current >= limit:
+                waits.append(
+                    retry_after(limit, period, elapsed, current, previous)
+                )
+        if waits:
+            self.wait_time = max(waits)
+        return bool(waits)
+
+    def wait(self):
+        return self.wait_time
+
+
+class AuthThrottle(SlidingWindowThrottle):
+    """Регистрация и получение токена: по адресу и имени пользователя."""
+
+    scope = 'auth'
+
+    def get_idents(self, request, view):
+        username = (
+            request.data.get('username')
+            if isinstance(request.data, Mapping) else None
+        )
+        return {
+            'address': self.get_ident(request),
+            'username': username if isinstance(username, str) else None,
+        }
+
+
+class WriteThrottle(SlidingWindowThrottle):
+    """Изменение отзывов и комментариев: по пользователю."""
+
+    scope = 'write'
+
+    def get_idents(self, request, view):
+        if request.method in SAFE_METHODS:
+            return {}
+        return {'user': request.user.pk}
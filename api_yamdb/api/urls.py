@@ -1,9 +1,10 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import (api_signup, api_token, UsersViewSet,
-                       CategoryViewSet, CommentViewSet, GenreViewSet,
-                       ReviewViewSet, TitleViewSet)
+from api.views import (api_profiles, api_signup, api_slow_queries,
+                       api_sql_stats, api_token, UsersViewSet, CategoryViewSet,
+                       CommentViewSet, GenreViewSet, ReviewViewSet,
+                       TitleViewSet)
 
 router_v1 = DefaultRouter()
 
@@ -34,4 +35,7 @@ auth_urlpatterns = [
 urlpatterns = [
     path('v1/', include(router_v1.urls)),
     path('v1/auth/', include(auth_urlpatterns)),
+    path('v1/stats/sql/', api_sql_stats, name='sql_stats'),
+    path('v1/stats/slow-queries/', api_slow_queries, name='slow_queries'),
+    path('v1/stats/profiles/', api_profiles, name='profiles'),
 ]
@@ -1,71 +1,84 @@
-from random import choice
-
-from django.core.mail import send_mail
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from api.filters import TitleFilter
+from api.authentication import add_role_claims
+from api.facets import FACETS_PARAM, get_title_facets
+from api.filters import TitleFilter, TitleSearchFilter
+from api.metrics import exposition
+from api.middleware import sql_stats
+from api.pagination import SwitchablePagination, TitlePagination
 from api.permissions import (IfAdminModeratorAuthorPermission, IsAdminOnly,
                              IsStaffOrReadOnly)
+from api.profiling import sampler
 from api.serializers import (CategorySerializer, CommentSerializer,
                              GenreSerializer, GetTitleSerializer,
                              ReviewSerializer, SignUpSerializer,
                              TitleSerializer, TokenSerializer, UsersSerializer)
-from api_yamdb.settings import DEFAULT_FROM_EMAIL, PIN_RANGE
-from reviews.models import Category, CustomUser, Genre, Review, Title
-
+from api.slow_queries import slow_query_log
+from api.throttling import AuthThrottle, WriteThrottle
+from api_yamdb.settings import METRICS_ALLOWED_IPS
+from reviews.models import (Category, ClaimsUser, Comment, CustomUser, Genre,
+                            Review, Title)
+from reviews.confirmation_codes import code_store
+from reviews.outbox import enqueue_email
+from reviews.usernames import usernames
 
-def generate_code():
-    return choice(range(PIN_RANGE))
+CONFIRMATION_CODE_EMAIL = 'confirmation_code'
+DUPLICATE_REVIEW = 'Один автор - один отзыв!'
 
 
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = add_role_claims(RefreshToken.for_user(user), user)
     return {"token": str(refresh.access_token)}
 
 
 def send_mail_code(code, email):
-    send_mail(
+    """Ставит письмо с кодом в очередь, отправит его send_outbox."""
+    enqueue_email(
+        CONFIRMATION_CODE_EMAIL,
+        email,
         'confirmation_code',
         f'Here is confirmation_code {code}',
-        DEFAULT_FROM_EMAIL,
-        [email],
-        fail_silently=False,
     )
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthThrottle])
 def api_signup(request):
     serializer = SignUpSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
     username = serializer.validated_data['username']
     email = serializer.validated_data['email']
     try:
-        user, _ = CustomUser.objects.get_or_create(
-            username=username,
-            email=email,
-        )
+        with transaction.atomic():
+            user, _ = CustomUser.objects.get_or_create(
+                username=username,
+                email=email,
+            )
+            code = code_store().issue(user.pk)
+            send_mail_code(code, user.email)
     except IntegrityError:
         data = 'Пользователь с таким именем или почтой уже существует'
         return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
-    code = generate_code()
-    user.confirmation_code = code
-    user.save()
-    send_mail_code(code, user.email)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthThrottle])
 def api_token(request):
     serializer = TokenSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -75,20 +88,72 @@ def api_token(request):
         CustomUser,
         username=username,
     )
-    if user.confirmation_code == confirmation_code:
+    if code_store().check(user.pk, confirmation_code):
         return Response(
             get_tokens_for_user(user),
             status=status.HTTP_200_OK
         )
-    code = generate_code()
-    user.confirmation_code = code
-    user.save()
     return Response(
         {'confirmation_code': 'Неверный код подтверждения'},
         status=status.HTTP_400_BAD_REQUEST
     )
 
 
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus для локального сборщика."""
+    if request.META.get('REMOTE_ADDR') not in METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminOnly])
+def api_sql_stats(request):
+    """Сводка SQL-запросов по маршрутам; DELETE обнуляет её."""
+    if request.method == 'DELETE':
+        sql_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(sql_stats.summary(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminOnly])
+def api_slow_queries(request):
+    """Последние медленные запросы; DELETE очищает журнал."""
+    if request.method == 'DELETE':
+        slow_query_log.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(slow_query_log.recent(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminOnly])
+def api_profiles(request):
+    """Список профилей или профиль ?route=&action= в свёрнутом формате
+    для flamegraph; DELETE удаляет профили."""
+    if request.method == 'DELETE':
+        sampler.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    route = request.query_params.get('route')
+    if route is None:
+        return Response(sampler.summary(), status=status.HTTP_200_OK)
+    action = request.query_params.get('action', 'get')
+    profile = sampler.collapsed((route, action))
+    if profile is None:
+        return Response(
+            {'detail': 'Профиль не найден.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    response = HttpResponse(profile, content_type='text/plain')
+    response['Content-Disposition'] = (
+        'attachment; filename="profile.collapsed"'
+    )
+    return response
+
+
 class UsersViewSet(viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = UsersSerializer
@@ -103,18 +168,21 @@ class UsersViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def me(self, request):
+        user = request.user
+        if isinstance(user, ClaimsUser):
+            user = get_object_or_404(CustomUser, pk=user.pk)
         if request.method == 'GET':
             return Response(
-                self.get_serializer(request.user).data,
+                self.get_serializer(user).data,
                 status=status.HTTP_200_OK
             )
         serializer = self.get_serializer(
-            request.user,
+            user,
             data=request.data,
             partial=True
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save(role=request.user.role)
+        serializer.save(role=user.role)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -142,10 +210,14 @@ class GenreViewSet(SlugLookupModelInstanceViewSet):
 
 
 class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all().annotate(rating=Avg('reviews__score'))
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre')
     permission_classes = (IsStaffOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, OrderingFilter,)
+    filter_backends = (DjangoFilterBackend, OrderingFilter,
+                       TitleSearchFilter)
     filterset_class = TitleFilter
+    pagination_class = TitlePagination
     ordering_fields = ('id', 'name', 'year', 'rating', 'description', 'genre',
                        'category')
     ordering = ('name',)
@@ -155,30 +227,94 @@ class TitleViewSet(viewsets.ModelViewSet):
             return GetTitleSerializer
         return TitleSerializer
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get(FACETS_PARAM):
+            response.data['facets'] = get_title_facets(
+                self.filter_queryset(self.get_queryset()),
+                request.query_params
+            )
+        return response
+
+
+class AuthorUsernamesMixin:
+    """Имена авторов в запросе страницы, если они не берутся из кэша;
+    удалению имя не нужно."""
+
+    def with_author_usernames(self, queryset):
+        if usernames.enabled or self.action == 'destroy':
+            return queryset
+        fields = [field.name for field in queryset.model._meta.concrete_fields]
+        return queryset.select_related('author').only(
+            *fields, 'author__username'
+        )
 
-class ReviewViewSet(viewsets.ModelViewSet):
+
+class ReviewViewSet(AuthorUsernamesMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = (IfAdminModeratorAuthorPermission,)
-
-    def get_title(self):
-        return get_object_or_404(Title, pk=self.kwargs.get('title_id'))
+    throttle_classes = (WriteThrottle,)
+    pagination_class = SwitchablePagination
+
+    @cached_property
+    def title(self):
+        """Произведение из URL, запрашивается один раз за запрос."""
+        return get_object_or_404(
+            Title.objects.only('pk'), pk=self.kwargs.get('title_id')
+        )
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.with_author_usernames(
+            Review.objects.filter(title_id=self.kwargs.get('title_id'))
+        )
+
+    def list(self, request, *args, **kwargs):
+        # Для несуществующего произведения 404, а не пустой список
+        self.title
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        """Повторный отзыв отсекает ограничение unique_review; другие
+        нарушения целостности не выдаются за повтор."""
+        author = self.request.user
+        try:
+            with transaction.atomic():
+                serializer.save(author=author, title=self.title)
+        except IntegrityError:
+            if not Review.objects.filter(
+                author_id=author.pk, title_id=self.title.pk
+            ).exists():
+                raise
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [DUPLICATE_REVIEW]}
+            )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(AuthorUsernamesMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (IfAdminModeratorAuthorPermission,)
-
-    def get_review(self):
-        return get_object_or_404(Review, pk=self.kwargs.get('review_id'))
+    throttle_classes = (WriteThrottle,)
+    pagination_class = SwitchablePagination
+
+    @cached_property
+    def review(self):
+        """Отзыв из URL, если он относится к произведению из URL."""
+        return get_object_or_404(
+            Review,
+            pk=self.kwargs.get('review_id'),
+            title_id=self.kwargs.get('title_id')
+        )
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.with_author_usernames(Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
+        ))
+
+    def list(self, request, *args, **kwargs):
+        # Для несуществующего отзыва 404, а не пустой список
+        self.review
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
+        serializer.save(author=self.request.user, review=self.review)
@@ -0,0 +1,104 @@
+"""Кэш, общий для процессов на хосте.
+
+Кэш по умолчанию (LocMemCache) у каждого процесса свой, поэтому
+данные, которые должны сбрасываться сразу во всех процессах, хранятся
+в файловом кэше SHARED_CACHE; его каталог (SHARED_CACHE_DIR) лучше
+держать в tmpfs. Записи кэша — pickle, поэтому каталог должен
+принадлежать пользователю сервера и быть закрыт для остальных:
+иначе чужой процесс мог бы подложить файлы, которые будут распакованы.
+"""
+import os
+import pickle
+import stat
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import locks
+
+from api_yamdb.settings import SHARED_CACHE
+
+
+def shared_cache():
+    return caches[SHARED_CACHE]
+
+
+def check_private_dir(path):
+    """Каталог принадлежит текущему пользователю и недоступен другим."""
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise ImproperlyConfigured(f'{path} не является каталогом')
+    if info.st_uid != os.getuid():
+        raise ImproperlyConfigured(
+            f'Каталог кэша {path} принадлежит другому пользователю'
+        )
+    if info.st_mode & 0o077:
+        raise ImproperlyConfigured(
+            f'Каталог кэша {path} доступен другим пользователям, '
+            f'нужны права 0700'
+        )
+
+
+class SharedFileCache(FileBasedCache):
+    """Файловый кэш для частых записей и счётчиков.
+
+    FileBasedCache при каждой записи перечисляет файлы каталога, чтобы
+    проверить MAX_ENTRIES; здесь каталог проверяется не чаще раза
+    в cull_interval секунд, и сначала удаляются просроченные записи.
+    add() и incr() выполняются под блокировкой файла lock_name,
+    поэтому атомарны для всех процессов.
+    """
+
+    cull_interval = 10
+    lock_name = 'lock'
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        check_private_dir(self._dir)
+        self.culled_at = 0
+
+    def _cull(self):
+        now = time.monotonic()
+        if now - self.culled_at < self.cull_interval:
+            return
+        self.culled_at = now
+        for path in self._list_cache_files():
+            try:
+                with open(path, 'rb') as f:
+                    self._is_expired(f)
+            except FileNotFoundError:
+                pass
+        super()._cull()
+
+    @contextmanager
+    def lock(self):
+        self._createdir()
+        with open(os.path.join(self._dir, self.lock_name), 'ab') as f:
+            locks.lock(f, locks.LOCK_EX)
+            yield
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.lock():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        """В отличие от BaseCache.incr сохраняет срок жизни записи."""
+        with self.lock():
+            try:
+                with open(self._key_to_file(key, version), 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except (FileNotFoundError, EOFError):
+                expiry = 0
+            if expiry is not None and expiry < time.time():
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            self.set(
+                key, value,
+                None if expiry is None else expiry - time.time(), version
+            )
+        return value
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -28,6 +29,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.SqlStatsMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -109,13 +113,111 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.PageNumberPagination',
     "PAGE_SIZE": 10,
 }
 
+# Курсорная пагинация по умолчанию для произведений, отзывов и комментариев,
+# иначе включается параметром ?pagination=cursor
+CURSOR_PAGINATION = False
+
+# Битовый индекс в памяти для фильтров произведений по жанрам,
+# категориям и годам
+TITLE_BITMAP_INDEX = True
+
+# Фасеты списка произведений: размер интервала лет и время жизни кэша
+FACET_YEAR_BUCKET = 10
+
+FACETS_CACHE_TIMEOUT = 60
+
+# Счётчики SQL-запросов по маршрутам API: сводка для администратора
+# и, по желанию, заголовки X-SQL-Queries и X-SQL-Time-Ms в ответах
+SQL_STATS = True
+
+SQL_STATS_HEADERS = False
+
+SQL_STATS_MAX_ROUTES = 200
+
+# Журнал медленных SQL-запросов: порог в миллисекундах (None отключает),
+# размер буфера в памяти и необязательный ротируемый файл
+SLOW_QUERY_THRESHOLD_MS = 100
+
+SLOW_QUERY_BUFFER = 100
+
+SLOW_QUERY_LOG_FILE = None
+
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+SLOW_QUERY_LOG_BACKUPS = 3
+
+# Выборочное профилирование запросов снятием стеков: доля запросов,
+# заголовок и маршруты, которые профилируются всегда, интервал снятия
+# стеков и число разных стеков в профиле одного маршрута.
+# Заголовок действует для администраторов или при значении,
+# равном PROFILE_SECRET (None — только для администраторов)
+PROFILING = False
+
+PROFILE_SAMPLE_RATE = 0.01
+
+PROFILE_HEADER = 'X-Profile'
+
+PROFILE_SECRET = None
+
+PROFILE_ROUTES = ()
+
+PROFILE_INTERVAL_MS = 5
+
+PROFILE_MAX_STACKS = 5000
+
+# Метрики Prometheus на /metrics: каталог файлов mmap, общий для процессов
+# на хосте, и адреса, с которых разрешено их читать
+METRICS = True
+
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'api_yamdb_metrics')
+
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+# Кэш в памяти процесса и файловый кэш, общий для процессов на хосте,
+# см. api_yamdb.cache. Каталог общего кэша задаётся при развёртывании
+# переменной окружения SHARED_CACHE_DIR (лучше в tmpfs); он должен
+# принадлежать пользователю сервера и иметь права 0700
+SHARED_CACHE = 'shared'
+
+SHARED_CACHE_DIR = os.environ.get(
+    'SHARED_CACHE_DIR', os.path.join(BASE_DIR, 'cache')
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    SHARED_CACHE: {
+        'BACKEND': 'api_yamdb.cache.SharedFileCache',
+        'LOCATION': SHARED_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Время жизни пользователя в общем кэше аутентификации, 0 отключает кэш
+USER_CACHE_TIMEOUT = 300
+
+# Время жизни версии прав пользователя в общем кэше, 0 отключает кэш
+TOKEN_VERSION_TIMEOUT = 300
+
+# Имена авторов отзывов и комментариев в памяти процесса вместо
+# соединения с таблицей пользователей: время жизни в секундах
+# (0 отключает кэш) и число имён
+USERNAME_CACHE_TIMEOUT = 0
+
+USERNAME_CACHE_SIZE = 10000
+
+# Роль и версия прав в access-токене: проверки прав без запроса
+# пользователя из БД
+TOKEN_ROLE_CLAIMS = False
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
@@ -128,6 +230,38 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 DEFAULT_FROM_EMAIL = 'admin@yamdb.com'
 
+# Очередь писем: размер пачки, пауза обработчика при пустой очереди,
+# число попыток и начальная задержка повтора в секундах (удваивается)
+EMAIL_OUTBOX_BATCH_SIZE = 100
+
+EMAIL_OUTBOX_INTERVAL = 5
+
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+
+EMAIL_OUTBOX_BACKOFF = 30
+
+# Ограничение частоты запросов, см. api.throttling: лимиты вида
+# 'число/период' для регистрации и получения токена по адресу клиента
+# и имени пользователя и для изменения отзывов и комментариев
+# по пользователю
+THROTTLE = True
+
+THROTTLE_RATES = {
+    'auth_address': '30/min',
+    'auth_username': '10/min',
+    'write_user': '30/min',
+}
+
+THROTTLE_CACHE = SHARED_CACHE
+
+# Коды подтверждения: хранилище ('database' или 'cache'), срок жизни
+# в секундах и число неверных попыток до блокировки кода
+CONFIRMATION_CODE_STORE = 'database'
+
+CONFIRMATION_CODE_TTL = 15 * 60
+
+CONFIRMATION_CODE_MAX_ATTEMPTS = 5
+
 PIN_RANGE = 999999
 
 MAX_LENGTH = 150
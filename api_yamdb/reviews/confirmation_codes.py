@@ -0,0 +1,94 @@
+"""Коды подтверждения для получения токена.
+
+Код живёт CONFIRMATION_CODE_TTL секунд и принимает не больше
+CONFIRMATION_CODE_MAX_ATTEMPTS неверных попыток, после чего нужно
+запросить новый через регистрацию. Коды хранятся отдельно от
+пользователей, чтобы выдача и проверка кода не переписывали строку
+в таблице пользователей. Хранилище задаёт CONFIRMATION_CODE_STORE:
+'database' — отдельная таблица, 'cache' — SHARED_CACHE, общий для
+процессов на хосте.
+"""
+from datetime import timedelta
+from random import choice
+
+from django.db.models import F
+from django.utils import timezone
+
+from api_yamdb.cache import shared_cache
+from api_yamdb.settings import (CONFIRMATION_CODE_MAX_ATTEMPTS,
+                                CONFIRMATION_CODE_STORE,
+                                CONFIRMATION_CODE_TTL, PIN_RANGE)
+from reviews.models import ConfirmationCode
+
+
+def generate_code():
+    return choice(range(PIN_RANGE))
+
+
+class DatabaseCodeStore:
+
+    def issue(self, user_id):
+        """Выдаёт новый код взамен прежнего."""
+        code = generate_code()
+        ConfirmationCode.objects.update_or_create(
+            user_id=user_id,
+            defaults={
+                'code': code,
+                'expires_at': (
+                    timezone.now()
+                    + timedelta(seconds=CONFIRMATION_CODE_TTL)
+                ),
+                'attempts': 0,
+            },
+        )
+        return code
+
+    def check(self, user_id, code):
+        active = ConfirmationCode.objects.filter(
+            user_id=user_id,
+            expires_at__gt=timezone.now(),
+            attempts__lt=CONFIRMATION_CODE_MAX_ATTEMPTS,
+        )
+        if active.filter(code=code).exists():
+            return True
+        active.update(attempts=F('attempts') + 1)
+        return False
+
+
+class CacheCodeStore:
+
+    def code_key(self, user_id):
+        return f'confirmation-code:{user_id}'
+
+    def attempts_key(self, user_id):
+        return f'confirmation-code-attempts:{user_id}'
+
+    def issue(self, user_id):
+        code = generate_code()
+        shared_cache().set_many(
+            {self.code_key(user_id): code, self.attempts_key(user_id): 0},
+            CONFIRMATION_CODE_TTL
+        )
+        return code
+
+    def check(self, user_id, code):
+        """Попытка засчитывается атомарным incr до сравнения кода,
+        поэтому параллельные запросы не превышают лимит."""
+        cache = shared_cache()
+        try:
+            attempts = cache.incr(self.attempts_key(user_id))
+        except ValueError:
+            return False
+        if attempts > CONFIRMATION_CODE_MAX_ATTEMPTS:
+            return False
+        return cache.get(self.code_key(user_id)) == code
+
+
+STORES = {
+    'database': DatabaseCodeStore(),
+    'cache': CacheCodeStore(),
+}
+
+
+def code_store():
+    return STORES[CONFIRMATION_CODE_STORE]
@@ -0,0 +1,37 @@
+"""Проверка строк csv в процессах пула data_loading --parallel.
+
+Модуль импортируется дочерними процессами до настройки Django,
+поэтому модели загружаются только внутри функций.
+"""
+import django
+from django.apps import apps
+from django.core.exceptions import ValidationError
+
+
+def init_worker():
+    django.setup()
+
+
+def validate_chunk(label, csv_file, fieldnames, first_row, rows):
+    """Проверяет пачку строк валидаторами полей модели.
+
+    Выполняется в отдельном процессе и не обращается к БД: внешние ключи
+    остаются как есть и проверяются при записи.
+    """
+    model = apps.get_model(label)
+    fields = [
+        field for field in map(model._meta.get_field, fieldnames)
+        if not field.is_relation and field.editable
+    ]
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=first_row):
+        data = dict(zip(fieldnames, row))
+        try:
+            for field in fields:
+                data[field.attname] = field.clean(data[field.attname], None)
+        except ValidationError as error:
+            message = ' '.join(error.messages)
+            errors.append((number, f'{field.name}: {message}'))
+        else:
+            valid.append((number, data))
+    return label, csv_file, fieldnames, valid, errors
@@ -1,9 +1,21 @@
 import csv
+import hashlib
+import multiprocessing
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, islice
 
+from django.apps import apps
 from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import UniqueConstraint
 
-from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
-                            Title, CustomUser)
+from reviews.csv_validation import init_worker, validate_chunk
+from reviews.models import (Category, Comment, CsvManifest, Genre,
+                            GenreTitle, Review, Title, CustomUser)
+from reviews.signals import recalculate_title_ratings, update_title_index
 
 TABLES = {
     CustomUser: 'users.csv',
@@ -20,11 +32,172 @@ replace_field = [
     'category',
 ]
 
+REFERENCES = {
+    'author_id': CustomUser,
+    'category_id': Category,
+    'genre_id': Genre,
+    'title_id': Title,
+    'review_id': Review,
+}
+
+BATCH_SIZE = 1000
+
+WORKERS = min(4, os.cpu_count() or 1)
+
+ERRORS_SHOWN = 10
+
+
+def read_chunks(reader, size):
+    while True:
+        chunk = list(islice(reader, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def file_checksum(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def unique_keys(model):
+    """Наборы полей, значения которых в таблице не повторяются."""
+    meta = model._meta
+    keys = [(field,) for field in meta.concrete_fields if field.unique]
+    keys += [
+        tuple(map(meta.get_field, names)) for names in meta.unique_together
+    ]
+    keys += [
+        tuple(map(meta.get_field, constraint.fields))
+        for constraint in meta.constraints
+        if isinstance(constraint, UniqueConstraint)
+        and constraint.condition is None
+    ]
+    return keys
+
+
+class UniqueKeys:
+    """Значения уникальных ключей таблицы и уже принятых строк.
+
+    Строки, которые нарушили бы ограничение, отсекаются до вставки,
+    поэтому bulk_create не теряет их молча и не прерывает загрузку.
+    """
+
+    def __init__(self, model):
+        self.values = {
+            fields: set(model.objects.values_list(
+                *(field.attname for field in fields)
+            ))
+            for fields in unique_keys(model)
+        }
+
+    def conflict(self, data, instance=None):
+        """Поля первого нарушенного ключа или None, если строка
+        принята; значения принятой строки запоминаются. Для изменения
+        существующей записи instance проверяются только изменённые
+        ключи, а её прежние значения освобождаются."""
+        accepted = {}
+        for fields, taken in self.values.items():
+            if any(field.attname not in data for field in fields):
+                continue
+            value = tuple(
+                field.to_python(data[field.attname]) for field in fields
+            )
+            previous = None if instance is None else tuple(
+                getattr(instance, field.attname) for field in fields
+            )
+            if None in value or value == previous:
+                continue
+            if value in taken:
+                return ', '.join(field.name for field in fields)
+            accepted[fields] = value, previous
+        for fields, (value, previous) in accepted.items():
+            self.values[fields].discard(previous)
+            self.values[fields].add(value)
+        return None
+
+
+def same_value(field, current, value):
+    if current in (None, '') and value in (None, ''):
+        return True
+    return current == field.to_python(value)
+
 
 class Command(BaseCommand):
     help = "Loads data from csv files"
 
+    def add_arguments(self, parser):
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Загружать файлы пачками через bulk_create, '
+                 'по одной транзакции на таблицу',
+        )
+        mode.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Пропускать неизменённые файлы, для изменённых применять '
+                 'только вставки, изменения и удаления строк',
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='С --incremental удалять строки, которых нет в файле; '
+                 'без флага они только подсчитываются',
+        )
+        mode.add_argument(
+            '--parallel',
+            action='store_true',
+            help='Разбирать и проверять файлы в пуле процессов, '
+                 'записывать пачками в порядке зависимостей таблиц',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=WORKERS,
+            help=f'Процессов для --parallel (по умолчанию {WORKERS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Строк в пачке для --bulk (по умолчанию {BATCH_SIZE})',
+        )
+
     def handle(self, *args, **kwargs):
+        self.verbosity = kwargs['verbosity']
+        # произведения, у которых менялись отзывы; None — все
+        self.rated_titles = set() if kwargs['incremental'] else None
+        if kwargs['parallel']:
+            self.parallel_load(kwargs['batch_size'], kwargs['workers'])
+            changed = True
+        else:
+            changed = self.load_files(**kwargs)
+        if changed:
+            self.recalculate_ratings(kwargs['batch_size'])
+            update_title_index(None)
+        self.stdout.write(
+            self.style.SUCCESS('Database successfully loaded into models!')
+        )
+
+    def recalculate_ratings(self, batch_size):
+        if self.rated_titles is None:
+            recalculate_title_ratings()
+            return
+        titles = sorted(self.rated_titles - {None})
+        for start in range(0, len(titles), batch_size):
+            recalculate_title_ratings(
+                Title.objects.filter(pk__in=titles[start:start + batch_size])
+            )
+
+    def load_files(self, **kwargs):
+        """Загружает файлы по одному; возвращает True, если данные
+        записывались в обход сигналов моделей."""
+        changed = False
         for model, csv_file in TABLES.items():
             file_path = f'./static/data/{csv_file}'
             try:
@@ -37,8 +210,281 @@ class Command(BaseCommand):
                     for index, field in enumerate(reader.fieldnames):
                         if field in replace_field:
                             reader.fieldnames[index] += '_id'
-                    for data in reader:
-                        model.objects.get_or_create(**data)
-        self.stdout.write(
-            self.style.SUCCESS('Database successfully loaded into models!')
+                    if kwargs['incremental']:
+                        changed = self.incremental_load(
+                            model, reader, csv_file,
+                            file_checksum(file_path), kwargs['batch_size'],
+                            kwargs['delete']
+                        ) or changed
+                    elif kwargs['bulk']:
+                        self.bulk_load(model, reader, kwargs['batch_size'])
+                        changed = True
+                    else:
+                        for data in reader:
+                            model.objects.get_or_create(**data)
+        return changed
+
+    def read_tasks(self, batch_size):
+        """Пачки сырых строк всех файлов в порядке TABLES."""
+        for model, csv_file in TABLES.items():
+            file_path = f'./static/data/{csv_file}'
+            try:
+                f = open(file_path, 'r', encoding='utf8')
+            except FileNotFoundError:
+                print(f'Sorry, the file "{csv_file}" does not exist.')
+                continue
+            with f:
+                reader = csv.reader(f, delimiter=',')
+                fieldnames = [
+                    f'{field}_id' if field in replace_field else field
+                    for field in next(reader)
+                ]
+                first_row = 2
+                for chunk in read_chunks(reader, batch_size):
+                    yield (model._meta.label, csv_file, fieldnames,
+                           first_row, chunk)
+                    first_row += len(chunk)
+
+    def validated_chunks(self, batch_size, workers):
+        """Проверяет пачки в пуле процессов и отдаёт результаты в порядке
+        чтения; впереди записи разбирается не больше 2 * workers пачек,
+        поэтому соседние независимые таблицы проверяются одновременно."""
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            workers, mp_context=context, initializer=init_worker
+        ) as pool:
+            pending = deque()
+            for task in self.read_tasks(batch_size):
+                pending.append(pool.submit(validate_chunk, *task))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def parallel_load(self, batch_size, workers):
+        """Единственный писатель: таблицы записываются в порядке TABLES,
+        каждая в своей транзакции. Ошибочные строки не прерывают загрузку,
+        а попадают в отчёт по таблицам."""
+        report = {}
+        chunks = self.validated_chunks(batch_size, workers)
+        for label, results in groupby(chunks, key=lambda chunk: chunk[0]):
+            model = apps.get_model(label)
+            loaded = 0
+            errors = []
+            references = None
+            unique = UniqueKeys(model)
+            started = time.monotonic()
+            with transaction.atomic():
+                for _, csv_file, fieldnames, rows, chunk_errors in results:
+                    errors.extend(chunk_errors)
+                    if references is None:
+                        references = self.load_references(fieldnames)
+                    objects = []
+                    for number, data in rows:
+                        if not self.resolve_references(data, references):
+                            errors.append(
+                                (number, 'ссылка на несуществующую запись')
+                            )
+                            continue
+                        conflict = unique.conflict(data)
+                        if conflict is not None:
+                            errors.append(
+                                (number, f'повтор уникального ключа '
+                                         f'({conflict})')
+                            )
+                            continue
+                        objects.append(model(**data))
+                    model.objects.bulk_create(objects, batch_size=batch_size)
+                    loaded += len(objects)
+            self.report(model, loaded, started)
+            report[csv_file] = errors
+        for csv_file, errors in report.items():
+            if not errors:
+                continue
+            self.stdout.write(self.style.WARNING(
+                f'{csv_file}: {len(errors)} rows rejected'
+            ))
+            for number, message in sorted(errors)[:ERRORS_SHOWN]:
+                self.stdout.write(f'  line {number}: {message}')
+
+    def bulk_load(self, model, reader, batch_size):
+        """Потоково читает файл пачками и вставляет их bulk_create.
+
+        Внешние ключи из REFERENCES проверяются по словарю id,
+        загруженному одним запросом, уникальные ключи — по UniqueKeys;
+        строки с неизвестной ссылкой или повтором пропускаются
+        и считаются отдельно от вставленных.
+        """
+        references = self.load_references(reader.fieldnames)
+        unique = UniqueKeys(model)
+        loaded = skipped = duplicates = 0
+        started = time.monotonic()
+        with transaction.atomic():
+            for chunk in read_chunks(reader, batch_size):
+                objects = []
+                for data in chunk:
+                    if not self.resolve_references(data, references):
+                        skipped += 1
+                    elif unique.conflict(data) is not None:
+                        duplicates += 1
+                    else:
+                        objects.append(model(**data))
+                model.objects.bulk_create(objects, batch_size=batch_size)
+                loaded += len(objects)
+                self.report(model, loaded, started, verbosity=2)
+        self.report(model, loaded, started, skipped=skipped,
+                    duplicates=duplicates)
+
+    def incremental_load(self, model, reader, csv_file, checksum,
+                         batch_size, delete=False):
+        """Сравнивает файл с таблицей по первичному ключу и применяет
+        только разницу. Строки таблицы, которых нет в файле, удаляются
+        только с delete: отзывы, комментарии и пользователи, созданные
+        через API, в csv не попадают. Строки с неизвестной ссылкой
+        пропускаются и считаются; контрольная сумма такого файла
+        не сохраняется, и при следующем запуске он загружается снова.
+        Строки, нарушающие уникальность (UniqueKeys), тоже пропускаются.
+        Вставленные и изменённые отзывы отмечают свои произведения
+        в rated_titles; удалённые пересчитываются сигналами.
+        Возвращает False, если файл не изменился."""
+        manifest = CsvManifest.objects.filter(file_name=csv_file).first()
+        if manifest is not None and manifest.checksum == checksum:
+            if self.verbosity >= 1:
+                self.stdout.write(
+                    f'{model.__name__}: {csv_file} not changed'
+                )
+            return False
+        references = self.load_references(reader.fieldnames)
+        fields = [
+            model._meta.get_field(name) for name in reader.fieldnames
+            if name != 'id'
+        ]
+        fields = [
+            field for field in fields
+            if not getattr(field, 'auto_now_add', False)
+        ]
+        stale = set(model.objects.values_list('pk', flat=True))
+        unique = UniqueKeys(model)
+        rows = 0
+        counts = Counter()
+        started = time.monotonic()
+        with transaction.atomic():
+            for chunk in read_chunks(reader, batch_size):
+                rows += len(chunk)
+                chunk = {int(data['id']): data for data in chunk}
+                stale.difference_update(chunk)
+                self.apply_chunk(
+                    model, chunk, references, unique, fields, batch_size,
+                    counts
+                )
+            stale = sorted(stale)
+            if delete:
+                for start in range(0, len(stale), batch_size):
+                    model.objects.filter(
+                        pk__in=stale[start:start + batch_size]
+                    ).delete()
+            if not counts['skipped'] and not counts['duplicates']:
+                CsvManifest.objects.update_or_create(
+                    file_name=csv_file,
+                    defaults={'checksum': checksum, 'rows': rows},
+                )
+        elapsed = time.monotonic() - started
+        message = (
+            f'{model.__name__}: {counts["inserted"]} inserted, '
+            f'{counts["updated"]} updated, '
+            f'{len(stale)} {"deleted" if delete else "missing in file"} '
+            f'in {elapsed:.1f} s'
         )
+        if counts['skipped']:
+            message += (
+                f', {counts["skipped"]} skipped with unknown references'
+            )
+        if counts['duplicates']:
+            message += f', {counts["duplicates"]} skipped as duplicates'
+        if self.verbosity >= 1:
+            self.stdout.write(message)
+        return True
+
+    def apply_chunk(self, model, chunk, references, unique, fields,
+                    batch_size, counts):
+        """Вставляет новые и обновляет изменённые строки пачки {pk: data},
+        добавляя в counts число вставленных, обновлённых и пропущенных."""
+        current = model.objects.in_bulk(list(chunk))
+        created, changed = [], []
+        for pk, data in chunk.items():
+            if not self.resolve_references(data, references):
+                counts['skipped'] += 1
+                continue
+            instance = current.get(pk)
+            if unique.conflict(data, instance) is not None:
+                counts['duplicates'] += 1
+                continue
+            if instance is None:
+                created.append(model(**data))
+                self.rate_titles(model, data.get('title_id'))
+                continue
+            title_id = getattr(instance, 'title_id', None)
+            if self.update_instance(instance, data, fields):
+                changed.append(instance)
+                self.rate_titles(
+                    model, title_id, getattr(instance, 'title_id', None)
+                )
+        model.objects.bulk_create(created, batch_size=batch_size)
+        if changed:
+            model.objects.bulk_update(
+                changed, [field.attname for field in fields],
+                batch_size=batch_size
+            )
+        counts['inserted'] += len(created)
+        counts['updated'] += len(changed)
+
+    def rate_titles(self, model, *title_ids):
+        if model is Review and self.rated_titles is not None:
+            self.rated_titles.update(title_ids)
+
+    @staticmethod
+    def update_instance(instance, data, fields):
+        changed = False
+        for field in fields:
+            value = data[field.attname]
+            if not same_value(field, getattr(instance, field.attname), value):
+                setattr(instance, field.attname, field.to_python(value))
+                changed = True
+        return changed
+
+    @staticmethod
+    def load_references(fieldnames):
+        return {
+            field: {
+                str(pk): pk
+                for pk in related.objects.values_list('pk', flat=True)
+            }
+            for field, related in REFERENCES.items()
+            if field in fieldnames
+        }
+
+    @staticmethod
+    def resolve_references(data, references):
+        for field, ids in references.items():
+            value = data[field]
+            if not value:
+                data[field] = None
+                continue
+            if value not in ids:
+                return False
+            data[field] = ids[value]
+        return True
+
+    def report(self, model, loaded, started, skipped=0, duplicates=0,
+               verbosity=1):
+        if self.verbosity < verbosity:
+            return
+        elapsed = time.monotonic() - started
+        rate = loaded / elapsed if elapsed else 0
+        message = (f'{model.__name__}: {loaded} rows in {elapsed:.1f} s '
+                   f'({rate:.0f} rows/s)')
+        if skipped:
+            message += f', {skipped} skipped with unknown references'
+        if duplicates:
+            message += f', {duplicates} skipped as duplicates'
+        self.stdout.write(message)
@@ -0,0 +1,152 @@
+import csv
+import os
+import time
+from argparse import ArgumentTypeError
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from reviews.management.commands.data_loading import (BATCH_SIZE,
+                                                      TABLES, read_chunks,
+                                                      replace_field)
+from reviews.signals import recalculate_title_ratings, update_title_index
+from reviews.synthetic import COLUMNS, SyntheticDataset
+
+MODELS = {csv_file: model for model, csv_file in TABLES.items()}
+
+
+def positive_int(value):
+    value = int(value)
+    if value < 1:
+        raise ArgumentTypeError('должно быть не меньше 1')
+    return value
+
+
+def insert_rows(model, columns, rows):
+    """Вставляет строки одним executemany в обход bulk_create: так
+    сохраняются даты auto_now_add и не создаются объекты моделей."""
+    fields = [model._meta.get_field(column) for column in columns]
+    defaults = [
+        (field, field.get_default())
+        for field in model._meta.concrete_fields
+        if field.attname not in columns
+    ]
+    fields += [field for field, _ in defaults]
+    defaults = [default for _, default in defaults]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(model._meta.db_table),
+        ', '.join(
+            connection.ops.quote_name(field.column) for field in fields
+        ),
+        ', '.join(['%s'] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [
+                field.get_db_prep_save(field.to_python(value), connection)
+                for field, value in zip(fields, (*row, *defaults))
+            ]
+            for row in rows
+        ])
+
+
+class Command(BaseCommand):
+    help = "Generates a synthetic dataset for load testing"
+
+    def add_arguments(self, parser):
+        output = parser.add_mutually_exclusive_group(required=True)
+        output.add_argument(
+            '--csv',
+            metavar='DIR',
+            help='Записать csv-файлы в формате static/data в каталог DIR',
+        )
+        output.add_argument(
+            '--database',
+            action='store_true',
+            help='Записать данные прямо в пустую БД',
+        )
+        for name, default in (('users', 1000), ('titles', 1000),
+                              ('reviews', 10000), ('comments', 20000),
+                              ('genres', 20), ('categories', 10)):
+            parser.add_argument(
+                f'--{name}',
+                type=positive_int,
+                default=default,
+                help=f'По умолчанию {default}',
+            )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа (по умолчанию 1.1)',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--batch-size',
+            type=positive_int,
+            default=BATCH_SIZE,
+            help=f'Строк в пачке записи (по умолчанию {BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **kwargs):
+        self.verbosity = kwargs['verbosity']
+        dataset = SyntheticDataset(
+            users=kwargs['users'],
+            titles=kwargs['titles'],
+            reviews=kwargs['reviews'],
+            comments=kwargs['comments'],
+            genres=kwargs['genres'],
+            categories=kwargs['categories'],
+            skew=kwargs['skew'],
+            seed=kwargs['seed'],
+        )
+        if kwargs['csv']:
+            self.write_csv(dataset, kwargs['csv'])
+        else:
+            self.write_database(dataset, kwargs['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS('Synthetic dataset successfully generated!')
+        )
+
+    def write_csv(self, dataset, directory):
+        os.makedirs(directory, exist_ok=True)
+        for csv_file, rows in dataset.tables():
+            started = time.monotonic()
+            path = os.path.join(directory, csv_file)
+            with open(path, 'w', encoding='utf8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(COLUMNS[csv_file])
+                count = 0
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+            self.report(csv_file, count, started)
+
+    def write_database(self, dataset, batch_size):
+        for model in TABLES:
+            if model.objects.exists():
+                raise CommandError(
+                    f'Таблица {model._meta.db_table} не пуста, '
+                    'синтетические данные пишутся только в пустую БД'
+                )
+        for csv_file, rows in dataset.tables():
+            model = MODELS[csv_file]
+            columns = [
+                f'{column}_id' if column in replace_field else column
+                for column in COLUMNS[csv_file]
+            ]
+            started = time.monotonic()
+            count = 0
+            with transaction.atomic():
+                for chunk in read_chunks(rows, batch_size):
+                    insert_rows(model, columns, chunk)
+                    count += len(chunk)
+            self.report(csv_file, count, started)
+        recalculate_title_ratings()
+        update_title_index(None)
+
+    def report(self, csv_file, count, started):
+        if self.verbosity < 1:
+            return
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'{csv_file}: {count} rows in {elapsed:.1f} s')
@@ -0,0 +1,70 @@
+import smtplib
+import time
+
+from django.core.mail import get_connection
+from django.core.management import BaseCommand
+
+from api_yamdb.settings import (EMAIL_OUTBOX_BACKOFF, EMAIL_OUTBOX_BATCH_SIZE,
+                                EMAIL_OUTBOX_INTERVAL)
+from reviews.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = "Sends queued emails from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Отправить всё, что готово к отправке, и завершиться',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EMAIL_OUTBOX_BATCH_SIZE,
+            help=f'Писем в пачке (по умолчанию {EMAIL_OUTBOX_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=EMAIL_OUTBOX_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста '
+                 f'(по умолчанию {EMAIL_OUTBOX_INTERVAL})',
+        )
+
+    def handle(self, *args, **kwargs):
+        """Ошибки почтового сервера, в том числе при первом подключении,
+        не останавливают обработчик: он ждёт, удваивая паузу до
+        EMAIL_OUTBOX_BACKOFF, и подключается заново."""
+        connection = get_connection()
+        sent = 0
+        errors = 0
+        try:
+            while True:
+                try:
+                    connection.open()
+                    taken = send_pending(connection, kwargs['batch_size'])
+                    errors = 0
+                except (smtplib.SMTPException, OSError) as error:
+                    self.stderr.write(f'Mail backend error: {error}')
+                    connection.close()
+                    taken = 0
+                    errors += 1
+                sent += taken
+                if taken:
+                    continue
+                if kwargs['once']:
+                    break
+                time.sleep(self.pause(kwargs['interval'], errors))
+        finally:
+            connection.close()
+        if kwargs['verbosity'] >= 1:
+            self.stdout.write(f'{sent} emails processed')
+
+    @staticmethod
+    def pause(interval, errors):
+        if not errors:
+            return interval
+        return max(interval, min(
+            interval * 2 ** (errors - 1), EMAIL_OUTBOX_BACKOFF
+        ))
@@ -1,7 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.core.validators import EmailValidator
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 from reviews.validators import validate_username, validate_year
 from api_yamdb.settings import MAX_LENGTH, MAX_LENGTH_EMAIL
@@ -11,6 +12,10 @@ ADMIN = 'admin'
 MODERATOR = 'moderator'
 USER = 'user'
 
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
 
 class NameSlugModel(models.Model):
     """Модель для Категории и Жанра."""
@@ -61,9 +66,6 @@ class CustomUser(AbstractUser):
         unique=True,
         validators=[EmailValidator]
     )
-    confirmation_code = models.BigIntegerField(
-        null=True,
-    )
     role = models.CharField(
         max_length=max(len(role) for role, _ in ROLE_CHOICES),
         choices=ROLE_CHOICES,
@@ -75,6 +77,11 @@ class CustomUser(AbstractUser):
         blank=True,
         verbose_name='Биография пользователя'
     )
+    token_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия прав в токенах'
+    )
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email']
 
@@ -101,6 +108,23 @@ class CustomUser(AbstractUser):
         return self.role == MODERATOR
 
 
+class ClaimsUser(CustomUser):
+    """Пользователь из утверждений access-токена или кэша
+    аутентификации, без запроса к БД.
+
+    Заполнены только id, username, роль и флаги, поэтому такой
+    объект нельзя сохранять.
+    """
+
+    class Meta:
+        proxy = True
+        verbose_name = 'Пользователь из токена'
+        verbose_name_plural = 'Пользователи из токенов'
+
+    def save(self, *args, **kwargs):
+        raise TypeError('Пользователь из токена не сохраняется')
+
+
 class Category(NameSlugModel):
     class Meta:
         verbose_name = 'Категория'
@@ -138,15 +162,53 @@ class Title(models.Model):
         verbose_name='Категория',
         related_name='titles',
     )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок'
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество отзывов'
+    )
+    rating = models.FloatField(
+        null=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Рейтинг'
+    )
+
+    RATING_FIELDS = ('score_sum', 'review_count', 'rating')
 
     class Meta:
         ordering = ('name',)
+        indexes = [
+            models.Index(fields=['name'], name='title_name_idx'),
+            models.Index(fields=['year'], name='title_year_idx'),
+        ]
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
 
     def __str__(self):
         return self.name[:15]
 
+    def save(self, *args, **kwargs):
+        """Поля рейтинга пишут только сигналы отзывов: при сохранении
+        существующего произведения они не перезаписываются значениями,
+        прочитанными до последних изменений отзывов."""
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class GenreTitle(models.Model):
     genre = models.ForeignKey(
@@ -215,9 +277,20 @@ class Review(TextAuthorPubDateModel):
                 name='unique_review'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date'],
+                name='review_title_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
 
+    def save(self, *args, **kwargs):
+        """Сохраняет отзыв и пересчитывает рейтинг в одной транзакции."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Comment(TextAuthorPubDateModel):
     review = models.ForeignKey(
@@ -227,5 +300,165 @@ class Comment(TextAuthorPubDateModel):
     )
 
     class Meta(TextAuthorPubDateModel.Meta):
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date'],
+                name='comment_review_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+
+
+class IndexVersion(models.Model):
+    """Счётчик изменений для кэшей в памяти процессов."""
+
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Индекс'
+    )
+    version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+
+    class Meta:
+        verbose_name = 'Версия индекса'
+        verbose_name_plural = 'Версии индексов'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class CsvManifest(models.Model):
+    """Контрольная сумма загруженного csv-файла для data_loading."""
+
+    file_name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Файл'
+    )
+    checksum = models.CharField(
+        max_length=64,
+        verbose_name='Контрольная сумма SHA-256'
+    )
+    rows = models.PositiveIntegerField(
+        verbose_name='Количество строк'
+    )
+    loaded_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата загрузки'
+    )
+
+    class Meta:
+        verbose_name = 'Загруженный файл'
+        verbose_name_plural = 'Загруженные файлы'
+
+    def __str__(self):
+        return self.file_name
+
+
+class EmailOutbox(models.Model):
+    """Письмо, ожидающее отправки фоновым обработчиком send_outbox."""
+
+    STATUS_CHOICES = [
+        (PENDING, 'Ожидает отправки'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    ]
+    kind = models.CharField(
+        max_length=50,
+        verbose_name='Тип письма'
+    )
+    recipient = models.EmailField(
+        max_length=MAX_LENGTH_EMAIL,
+        verbose_name='Получатель'
+    )
+    subject = models.CharField(
+        max_length=255,
+        verbose_name='Тема'
+    )
+    body = models.TextField(
+        verbose_name='Текст'
+    )
+    status = models.CharField(
+        max_length=max(len(status) for status, _ in STATUS_CHOICES),
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Состояние'
+    )
+    version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Версия текста'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки отправки'
+    )
+    send_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Отправить не раньше'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата отправки'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'recipient'],
+                condition=models.Q(status=PENDING),
+                name='unique_pending_email'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'send_after'],
+                name='outbox_status_send_after_idx'
+            ),
+        ]
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+
+    def __str__(self):
+        return f'{self.kind}: {self.recipient}'
+
+
+class ConfirmationCode(models.Model):
+    """Код подтверждения для получения токена."""
+
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пользователь'
+    )
+    code = models.BigIntegerField(
+        verbose_name='Код'
+    )
+    expires_at = models.DateTimeField(
+        verbose_name='Действует до'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Неудачные попытки'
+    )
+
+    class Meta:
+        verbose_name = 'Код подтверждения'
+        verbose_name_plural = 'Коды подтверждения'
+
+    def __str__(self):
+        return str(self.user_id)
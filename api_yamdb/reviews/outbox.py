@@ -0,0 +1,106 @@
+"""Очередь писем в БД.
+
+Письмо записывается в EmailOutbox в той же транзакции, что и данные,
+о которых оно сообщает, а отправляет его команда send_outbox пачками
+через одно соединение с почтовым сервером. Для пары (тип, адрес)
+в очереди хранится не больше одного неотправленного письма: повторная
+регистрация заменяет его текст и увеличивает версию. Обработчик
+рассчитан на запуск в одном экземпляре.
+"""
+import smtplib
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.core.mail import EmailMessage
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from api_yamdb.settings import (DEFAULT_FROM_EMAIL, EMAIL_OUTBOX_BACKOFF,
+                                EMAIL_OUTBOX_MAX_ATTEMPTS)
+from reviews.models import FAILED, PENDING, SENT, EmailOutbox
+
+
+def enqueue_email(kind, recipient, subject, body):
+    """Ставит письмо в очередь или заменяет ожидающее письмо того же
+    типа на этот адрес."""
+    fields = {
+        'subject': subject,
+        'body': body,
+        'attempts': 0,
+        'send_after': timezone.now(),
+        'last_error': '',
+    }
+    pending = EmailOutbox.objects.filter(
+        kind=kind, recipient=recipient, status=PENDING
+    )
+    if pending.update(version=F('version') + 1, **fields):
+        return
+    try:
+        with transaction.atomic():
+            EmailOutbox.objects.create(
+                kind=kind, recipient=recipient, **fields
+            )
+    except IntegrityError:
+        pending.update(version=F('version') + 1, **fields)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=EMAIL_OUTBOX_BACKOFF * 2 ** (attempts - 1))
+
+
+def send_pending(connection, batch_size,
+                 max_attempts=EMAIL_OUTBOX_MAX_ATTEMPTS):
+    """Отправляет одну пачку писем, срок которых наступил.
+
+    Возвращает число взятых писем. Письмо, текст которого заменили
+    во время отправки, остаётся в очереди с новым текстом.
+    """
+    now = timezone.now()
+    batch = list(
+        EmailOutbox.objects.filter(status=PENDING, send_after__lte=now)
+        .order_by('send_after', 'pk')[:batch_size]
+    )
+    sent = []
+    try:
+        for email in batch:
+            if send_email(connection, email, now, max_attempts):
+                sent.append(email)
+    finally:
+        # Отправленные письма отмечаются, даже если соединение
+        # не удалось открыть заново, иначе они уйдут повторно
+        mark_sent(sent)
+    return len(batch)
+
+
+def send_email(connection, email, now, max_attempts):
+    """Отправляет письмо; при ошибке откладывает повтор и открывает
+    соединение заново."""
+    message = EmailMessage(
+        email.subject, email.body, DEFAULT_FROM_EMAIL,
+        [email.recipient], connection=connection
+    )
+    try:
+        message.send()
+    except (smtplib.SMTPException, OSError) as error:
+        attempts = email.attempts + 1
+        EmailOutbox.objects.filter(
+            pk=email.pk, version=email.version
+        ).update(
+            attempts=attempts,
+            status=FAILED if attempts >= max_attempts else PENDING,
+            send_after=now + retry_delay(attempts),
+            last_error=str(error),
+        )
+        connection.close()
+        connection.open()
+        return False
+    return True
+
+
+def mark_sent(emails):
+    if emails:
+        EmailOutbox.objects.filter(reduce(or_, (
+            Q(pk=email.pk, version=email.version) for email in emails
+        ))).update(status=SENT, sent_at=timezone.now())
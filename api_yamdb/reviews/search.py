@@ -0,0 +1,92 @@
+"""Полнотекстовый индекс произведений на SQLite FTS5.
+
+Индекс хранится в виртуальной таблице с внешним содержимым
+(content='reviews_title') и поддерживается триггерами, поэтому
+синхронизирован при любой записи в Title, включая bulk_create и update.
+SQLite пересоздаёт таблицу при изменении схемы и теряет её триггеры,
+поэтому они заново создаются после каждого migrate.
+"""
+import re
+
+from django.db import connections
+
+TITLE_SEARCH_TABLE = 'reviews_title_fts'
+
+CREATE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TITLE_SEARCH_TABLE} "
+    "USING fts5(name, description, content='reviews_title', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+)
+CREATE_TRIGGERS_SQL = (
+    f"CREATE TRIGGER IF NOT EXISTS {TITLE_SEARCH_TABLE}_ai "
+    "AFTER INSERT ON reviews_title BEGIN "
+    f"INSERT INTO {TITLE_SEARCH_TABLE}(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TITLE_SEARCH_TABLE}_ad "
+    "AFTER DELETE ON reviews_title BEGIN "
+    f"INSERT INTO {TITLE_SEARCH_TABLE}"
+    f"({TITLE_SEARCH_TABLE}, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TITLE_SEARCH_TABLE}_au "
+    "AFTER UPDATE OF name, description ON reviews_title BEGIN "
+    f"INSERT INTO {TITLE_SEARCH_TABLE}"
+    f"({TITLE_SEARCH_TABLE}, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    f"INSERT INTO {TITLE_SEARCH_TABLE}(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+)
+REBUILD_SQL = (
+    f"INSERT INTO {TITLE_SEARCH_TABLE}({TITLE_SEARCH_TABLE}) "
+    "VALUES ('rebuild')"
+)
+DROP_SQL = (
+    f'DROP TRIGGER IF EXISTS {TITLE_SEARCH_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {TITLE_SEARCH_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {TITLE_SEARCH_TABLE}_au',
+    f'DROP TABLE IF EXISTS {TITLE_SEARCH_TABLE}',
+)
+
+TERM_PATTERN = re.compile(r'\w+')
+
+
+def search_available(connection):
+    return connection.vendor == 'sqlite'
+
+
+def install_title_search(connection, rebuild=False):
+    """Создаёт таблицу индекса и триггеры, при rebuild заполняет индекс."""
+    if not search_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        for statement in CREATE_TRIGGERS_SQL:
+            cursor.execute(statement)
+        if rebuild:
+            cursor.execute(REBUILD_SQL)
+
+
+def uninstall_title_search(connection):
+    if not search_available(connection):
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+def build_match_query(text):
+    """Переводит строку поиска в безопасный запрос FTS5.
+
+    Каждое слово ищется по префиксу, все слова должны встретиться.
+    """
+    terms = TERM_PATTERN.findall(text)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def restore_title_search(using, **kwargs):
+    """Возвращает триггеры индекса, потерянные при пересоздании таблицы."""
+    connection = connections[using]
+    if (
+        search_available(connection)
+        and TITLE_SEARCH_TABLE in connection.introspection.table_names()
+    ):
+        install_title_search(connection)
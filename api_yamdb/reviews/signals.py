@@ -0,0 +1,213 @@
+from django.db import transaction
+from django.db.models import (Avg, Count, ExpressionWrapper, F, FloatField,
+                              OuterRef, Subquery, Sum)
+from django.db.models.functions import Coalesce, NullIf
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+
+from api_yamdb.settings import TITLE_BITMAP_INDEX
+from reviews.models import (Category, CustomUser, Genre, GenreTitle, Review,
+                            Title)
+from reviews.title_index import title_index
+from reviews.user_cache import invalidate_user
+from reviews.usernames import usernames
+
+
+def update_title_rating(title_id, score_delta, count_delta):
+    """Сдвигает сумму оценок и число отзывов произведения одним UPDATE."""
+    Title.objects.filter(pk=title_id).update(
+        score_sum=F('score_sum') + score_delta,
+        review_count=F('review_count') + count_delta,
+        rating=ExpressionWrapper(
+            (F('score_sum') + score_delta) * 1.0
+            / NullIf(F('review_count') + count_delta, 0),
+            output_field=FloatField()
+        ),
+    )
+
+
+def recalculate_title_ratings(titles=None):
+    """Пересчитывает рейтинг по таблице отзывов (для массовых загрузок)."""
+    if titles is None:
+        titles = Title.objects.all()
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    titles.update(
+        score_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum('score')).values('total')),
+            0
+        ),
+        review_count=Coalesce(
+            Subquery(reviews.annotate(total=Count('pk')).values('total')),
+            0
+        ),
+        rating=Subquery(reviews.annotate(avg=Avg('score')).values('avg')),
+    )
+
+
+def remember_rating_state(instance):
+    fields = instance.__dict__
+    instance._rating_state = (fields.get('title_id'), fields.get('score'))
+
+
+@receiver(post_init, sender=Review)
+def review_post_init(sender, instance, **kwargs):
+    remember_rating_state(instance)
+
+
+@receiver(post_save, sender=Review)
+def review_post_save(sender, instance, created, **kwargs):
+    title_id, score = instance._rating_state
+    if created:
+        update_title_rating(instance.title_id, instance.score, 1)
+    elif score is None or title_id is None:
+        recalculate_title_ratings(
+            Title.objects.filter(pk=instance.title_id)
+        )
+    elif title_id != instance.title_id:
+        update_title_rating(title_id, -score, -1)
+        update_title_rating(instance.title_id, instance.score, 1)
+    elif score != instance.score:
+        update_title_rating(title_id, instance.score - score, 0)
+    remember_rating_state(instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_post_delete(sender, instance, **kwargs):
+    title_id, score = instance._rating_state
+    if score is None:
+        recalculate_title_ratings(Title.objects.filter(pk=title_id))
+        return
+    update_title_rating(title_id, -score, -1)
+
+
+def update_title_index(change, *args):
+    if TITLE_BITMAP_INDEX:
+        title_index.apply(change, *args)
+
+
+@receiver(post_save, sender=Title)
+def title_post_save(sender, instance, **kwargs):
+    update_title_index(
+        title_index.title_saved,
+        instance.pk, instance.year, instance.category_id
+    )
+
+
+@receiver(post_delete, sender=Title)
+def title_post_delete(sender, instance, **kwargs):
+    update_title_index(title_index.remove_title, instance.pk)
+
+
+@receiver(post_save, sender=GenreTitle)
+def genre_title_post_save(sender, instance, created, **kwargs):
+    if not created:
+        update_title_index(None)
+        return
+    update_title_index(
+        title_index.add_genres, [(instance.title_id, instance.genre_id)]
+    )
+
+
+@receiver(post_delete, sender=GenreTitle)
+def genre_title_post_delete(sender, instance, **kwargs):
+    update_title_index(
+        title_index.remove_genres, [(instance.title_id, instance.genre_id)]
+    )
+
+
+@receiver(m2m_changed, sender=GenreTitle)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if action == 'post_clear':
+        if reverse:
+            update_title_index(None)
+        else:
+            update_title_index(title_index.clear_genres, instance.pk)
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+    pairs = [
+        (pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set
+    ]
+    update_title_index(
+        title_index.add_genres if action == 'post_add'
+        else title_index.remove_genres,
+        pairs
+    )
+
+
+@receiver(post_save, sender=Genre)
+def genre_post_save(sender, instance, created, **kwargs):
+    update_title_index(
+        title_index.add_genre_slug if created else None,
+        instance.pk, instance.slug
+    )
+
+
+@receiver(post_save, sender=Category)
+def category_post_save(sender, instance, created, **kwargs):
+    update_title_index(
+        title_index.add_category_slug if created else None,
+        instance.pk, instance.slug
+    )
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Category)
+def slug_model_post_delete(sender, instance, **kwargs):
+    update_title_index(None)
+
+
+TOKEN_CLAIM_FIELDS = ('username', 'role', 'is_staff', 'is_active')
+
+
+def remember_token_claims(instance):
+    fields = instance.__dict__
+    instance._token_claims = tuple(
+        fields.get(name) for name in TOKEN_CLAIM_FIELDS
+    )
+
+
+@receiver(post_init, sender=CustomUser)
+def user_post_init(sender, instance, **kwargs):
+    remember_token_claims(instance)
+
+
+def invalidate_user_caches(user_id, username_changed=True):
+    """Сбрасывает кэши пользователя сразу и ещё раз после фиксации
+    транзакции: иначе параллельный запрос может прочитать старую строку
+    до фиксации и вернуть её в кэш."""
+    def invalidate():
+        invalidate_user(user_id)
+        if username_changed:
+            usernames.invalidate(user_id)
+
+    invalidate()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=CustomUser)
+def user_post_save(sender, instance, created, **kwargs):
+    """Смена полей из утверждений токена увеличивает версию прав,
+    и выданные токены с ролью перестают приниматься без проверки по БД."""
+    claims = instance._token_claims
+    remember_token_claims(instance)
+    if not created and instance._token_claims != claims:
+        CustomUser.objects.filter(pk=instance.pk).update(
+            token_version=F('token_version') + 1
+        )
+        instance.token_version += 1
+    invalidate_user_caches(
+        instance.pk,
+        # сменилось имя пользователя
+        not created and instance._token_claims[0] != claims[0]
+    )
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_post_delete(sender, instance, **kwargs):
+    invalidate_user_caches(instance.pk)
@@ -0,0 +1,262 @@
+"""Генератор синтетических данных для нагрузочных тестов.
+
+Популярность произведений, отзывов и авторов распределена по закону
+Ципфа: небольшая доля записей получает большую часть отзывов
+и комментариев. Ранг записи переводится в id перестановкой
+по модулю, поэтому популярные записи разбросаны по всей таблице.
+Строки выдаются генераторами в порядке столбцов csv из static/data,
+память не растёт с объёмом данных.
+"""
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from math import gcd
+
+from reviews.models import ADMIN, MODERATOR, USER
+
+COLUMNS = {
+    'users.csv': ('id', 'username', 'email', 'role', 'bio', 'first_name',
+                  'last_name'),
+    'category.csv': ('id', 'name', 'slug'),
+    'genre.csv': ('id', 'name', 'slug'),
+    'titles.csv': ('id', 'name', 'year', 'category'),
+    'genre_title.csv': ('id', 'title_id', 'genre_id'),
+    'review.csv': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'comments.csv': ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+
+WORDS = (
+    'тайна', 'город', 'ночь', 'дорога', 'море', 'звезда', 'песня', 'время',
+    'ветер', 'огонь', 'тень', 'сад', 'остров', 'зима', 'письмо', 'путь',
+    'свет', 'дом', 'мост', 'берег', 'сон', 'гроза', 'лес', 'память',
+)
+MAX_GENRES = 3
+FIRST_YEAR = 1900
+YEARS_SCALE = 15
+START_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc)
+COMMENT_DELAY = timedelta(days=30)
+GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+SCATTER_FACTOR = 2654435761
+
+
+class Zipf:
+    """Ранги 0..n-1 с вероятностью, убывающей как 1 / (ранг + 1) ** skew.
+
+    Используется непрерывное приближение функции распределения,
+    поэтому выборка не требует таблицы весов.
+    """
+
+    def __init__(self, n, skew):
+        self.n = n
+        self.skew = skew
+        self.total = self.integral(n + 1)
+
+    def integral(self, x):
+        if self.skew == 1:
+            return math.log(x)
+        return (x ** (1 - self.skew) - 1) / (1 - self.skew)
+
+    def inverse(self, y):
+        if self.skew == 1:
+            return math.exp(y)
+        return (y * (1 - self.skew) + 1) ** (1 / (1 - self.skew))
+
+    def share(self, rank):
+        """Доля ранга rank в общем объёме."""
+        return (
+            self.integral(rank + 2) - self.integral(rank + 1)
+        ) / self.total
+
+    def sample(self, rng):
+        rank = int(self.inverse(rng.random() * self.total)) - 1
+        return min(max(rank, 0), self.n - 1)
+
+
+class Scatter:
+    """Взаимно однозначное отображение ранга в номер записи."""
+
+    def __init__(self, n):
+        self.n = n
+        factor = SCATTER_FACTOR % n or 1
+        while gcd(factor, n) != 1:
+            factor += 1
+        self.factor = factor
+        self.inverse_factor = pow(factor, -1, n) if n > 1 else 0
+
+    def to_index(self, rank):
+        return rank * self.factor % self.n
+
+    def to_rank(self, index):
+        return index * self.inverse_factor % self.n
+
+
+def allocate(total, shares, limit=None):
+    """Раскладывает total по долям по накопленной сумме, чтобы ошибки
+    округления не копились; не больше limit на одну запись."""
+    cumulative = 0.0
+    assigned = 0
+    for share in shares:
+        cumulative += share
+        count = max(0, round(total * cumulative) - assigned)
+        if limit is not None:
+            count = min(count, limit)
+        assigned += count
+        yield count
+
+
+class SyntheticDataset:
+    """Воспроизводимый при одинаковом seed набор данных."""
+
+    def __init__(self, users, titles, reviews, comments, genres=20,
+                 categories=10, skew=1.1, seed=1):
+        self.counts = {
+            'users': users,
+            'titles': titles,
+            'reviews': reviews,
+            'comments': comments,
+            'genres': genres,
+            'categories': categories,
+        }
+        self.skew = skew
+        self.seed = seed
+        self.now = datetime.now(timezone.utc)
+        self.review_total = None
+
+    def random(self, table):
+        return random.Random(f'{self.seed}:{table}')
+
+    def tables(self):
+        """Пары (имя csv-файла, строки) в порядке загрузки."""
+        return (
+            ('users.csv', self.users()),
+            ('category.csv', self.categories()),
+            ('genre.csv', self.genres()),
+            ('titles.csv', self.titles()),
+            ('genre_title.csv', self.genre_titles()),
+            ('review.csv', self.reviews()),
+            ('comments.csv', self.comments()),
+        )
+
+    def text(self, rng, words):
+        return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    def users(self):
+        rng = self.random('users')
+        for user_id in range(1, self.counts['users'] + 1):
+            role = rng.random()
+            role = ADMIN if role < 0.001 else (
+                MODERATOR if role < 0.01 else USER
+            )
+            yield (user_id, f'user{user_id}', f'user{user_id}@yamdb.fake',
+                   role, '', '', '')
+
+    def categories(self):
+        for category_id in range(1, self.counts['categories'] + 1):
+            yield (category_id, f'Категория {category_id}',
+                   f'category-{category_id}')
+
+    def genres(self):
+        for genre_id in range(1, self.counts['genres'] + 1):
+            yield genre_id, f'Жанр {genre_id}', f'genre-{genre_id}'
+
+    def titles(self):
+        rng = self.random('titles')
+        categories = Zipf(self.counts['categories'], self.skew)
+        for title_id in range(1, self.counts['titles'] + 1):
+            year = max(
+                FIRST_YEAR,
+                self.now.year - int(rng.expovariate(1 / YEARS_SCALE))
+            )
+            name = f'{self.text(rng, rng.randint(1, 3))} {title_id}'
+            yield title_id, name, year, categories.sample(rng) + 1
+
+    def genre_titles(self):
+        rng = self.random('genre_titles')
+        genres = Zipf(self.counts['genres'], self.skew)
+        genre_title_id = 0
+        for title_id in range(1, self.counts['titles'] + 1):
+            count = min(rng.randint(1, MAX_GENRES), self.counts['genres'])
+            chosen = set()
+            while len(chosen) < count:
+                chosen.add(genres.sample(rng) + 1)
+            for genre_id in sorted(chosen):
+                genre_title_id += 1
+                yield genre_title_id, title_id, genre_id
+
+    def distinct_authors(self, rng, authors, scatter, count):
+        """count разных авторов: сначала по популярности, а когда
+        популярные исчерпаны, подряд со случайного места."""
+        chosen = set()
+        misses = 0
+        while len(chosen) < count and misses < 4 * count + 16:
+            rank = authors.sample(rng)
+            if rank in chosen:
+                misses += 1
+            else:
+                chosen.add(rank)
+        start = rng.randrange(authors.n)
+        step = 0
+        while len(chosen) < count:
+            chosen.add((start + step) % authors.n)
+            step += 1
+        return sorted(scatter.to_index(rank) + 1 for rank in chosen)
+
+    def review_date(self, review_id):
+        """Дата отзыва вычисляется по id, чтобы комментарии
+        не требовали хранить даты всех отзывов."""
+        span = (self.now - START_DATE).total_seconds()
+        fraction = review_id * GOLDEN_RATIO % 1
+        return START_DATE + timedelta(seconds=span * fraction)
+
+    def reviews(self):
+        """Отзывы по произведениям; пара (автор, произведение)
+        не повторяется из-за ограничения unique_review."""
+        rng = self.random('reviews')
+        titles = Zipf(self.counts['titles'], self.skew)
+        title_scatter = Scatter(self.counts['titles'])
+        authors = Zipf(self.counts['users'], self.skew)
+        author_scatter = Scatter(self.counts['users'])
+        shares = (
+            titles.share(title_scatter.to_rank(index))
+            for index in range(self.counts['titles'])
+        )
+        review_id = 0
+        counts = allocate(
+            self.counts['reviews'], shares, limit=self.counts['users']
+        )
+        for title_id, count in enumerate(counts, start=1):
+            quality = rng.uniform(3, 9)
+            for author_id in self.distinct_authors(
+                rng, authors, author_scatter, count
+            ):
+                review_id += 1
+                score = min(10, max(1, round(rng.gauss(quality, 2))))
+                yield (review_id, title_id, self.text(rng, 12), author_id,
+                       score, self.review_date(review_id).isoformat())
+        self.review_total = review_id
+
+    def comments(self):
+        if self.review_total is None:
+            for _ in self.reviews():
+                pass
+        rng = self.random('comments')
+        reviews = Zipf(max(self.review_total, 1), self.skew)
+        review_scatter = Scatter(max(self.review_total, 1))
+        authors = Zipf(self.counts['users'], self.skew)
+        author_scatter = Scatter(self.counts['users'])
+        shares = (
+            reviews.share(review_scatter.to_rank(index))
+            for index in range(self.review_total)
+        )
+        comment_id = 0
+        counts = allocate(self.counts['comments'], shares)
+        for review_id, count in enumerate(counts, start=1):
+            published = self.review_date(review_id)
+            for _ in range(count):
+                comment_id += 1
+                author_id = author_scatter.to_index(authors.sample(rng)) + 1
+                pub_date = min(
+                    self.now, published + COMMENT_DELAY * rng.random()
+                )
+                yield (comment_id, review_id, self.text(rng, 8), author_id,
+                       pub_date.isoformat())
@@ -0,0 +1,243 @@
+"""Битовый индекс произведений по жанрам, категориям и годам.
+
+Каждому slug жанра и категории и каждому году соответствует битовая
+маска (целое число), в которой бит N установлен для произведения с id N.
+Фильтр по нескольким жанрам, категории и диапазону лет сводится
+к пересечению масок без соединений в SQL.
+
+Индекс живёт в памяти процесса. Процесс, изменивший данные, обновляет
+индекс на месте и увеличивает версию в таблице IndexVersion; остальные
+процессы видят новую версию и перестраивают индекс целиком.
+"""
+import threading
+
+from django.db.models import F
+from django.dispatch import Signal
+
+from reviews.models import Category, Genre, GenreTitle, IndexVersion, Title
+
+INDEX_NAME = 'titles'
+ANY = 'any'
+ALL = 'all'
+
+# Отправляется при каждой проверке актуальности индекса, fresh=False
+# означает, что индекс пришлось перестроить
+index_checked = Signal(providing_args=['fresh'])
+
+
+def get_version():
+    return IndexVersion.objects.filter(
+        name=INDEX_NAME
+    ).values_list('version', flat=True).first()
+
+
+def bump_version():
+    """Увеличивает версию и возвращает пару (старая, новая)."""
+    updated = IndexVersion.objects.filter(name=INDEX_NAME).update(
+        version=F('version') + 1
+    )
+    if not updated:
+        IndexVersion.objects.get_or_create(name=INDEX_NAME)
+        return None, get_version()
+    version = get_version()
+    return version - 1, version
+
+
+def bits_to_ids(bits):
+    """Номера установленных битов по возрастанию."""
+    ids = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            ids.append(index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ids
+
+
+def bit_count(bits):
+    return bin(bits).count('1')
+
+
+class TitleBitmapIndex:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.stale = True
+        self.clear()
+
+    def clear(self):
+        self.all = 0
+        self.genres = {}
+        self.categories = {}
+        self.years = {}
+        self.title_keys = {}
+        self.title_genres = {}
+        self.genre_slugs = {}
+        self.category_slugs = {}
+
+    def rebuild(self, version):
+        with self.lock:
+            self.clear()
+            self.genre_slugs = dict(Genre.objects.values_list('id', 'slug'))
+            self.category_slugs = dict(
+                Category.objects.values_list('id', 'slug')
+            )
+            titles = Title.objects.values_list('id', 'year', 'category_id')
+            for title_id, year, category_id in titles.iterator():
+                self.add_title(title_id, year, category_id)
+            genre_titles = GenreTitle.objects.values_list(
+                'title_id', 'genre_id'
+            )
+            for title_id, genre_id in genre_titles.iterator():
+                self.add_genre(title_id, genre_id)
+            self.version = version
+            self.stale = False
+
+    def ensure_fresh(self):
+        version = get_version()
+        with self.lock:
+            fresh = not self.stale and version == self.version
+            if not fresh:
+                self.rebuild(version)
+        index_checked.send(sender=self.__class__, fresh=fresh)
+
+    def add_title(self, title_id, year, category_id):
+        bit = 1 << title_id
+        category = None
+        if category_id is not None:
+            category = self.category_slugs[category_id]
+            self.categories[category] = (
+                self.categories.get(category, 0) | bit
+            )
+        self.all |= bit
+        self.years[year] = self.years.get(year, 0) | bit
+        self.title_keys[title_id] = (year, category)
+
+    def add_genre(self, title_id, genre_id):
+        genre = self.genre_slugs[genre_id]
+        self.genres[genre] = self.genres.get(genre, 0) | (1 << title_id)
+        self.title_genres.setdefault(title_id, set()).add(genre)
+
+    def remove_genre(self, title_id, genre_id):
+        genre = self.genre_slugs[genre_id]
+        if genre in self.genres:
+            self.genres[genre] &= ~(1 << title_id)
+        self.title_genres.get(title_id, set()).discard(genre)
+
+    def add_genres(self, pairs):
+        for title_id, genre_id in pairs:
+            self.add_genre(title_id, genre_id)
+
+    def remove_genres(self, pairs):
+        for title_id, genre_id in pairs:
+            self.remove_genre(title_id, genre_id)
+
+    def clear_genres(self, title_id):
+        for genre in self.title_genres.pop(title_id, ()):
+            self.genres[genre] &= ~(1 << title_id)
+
+    def add_genre_slug(self, genre_id, slug):
+        self.genre_slugs[genre_id] = slug
+
+    def add_category_slug(self, category_id, slug):
+        self.category_slugs[category_id] = slug
+
+    def remove_title(self, title_id):
+        mask = ~(1 << title_id)
+        self.all &= mask
+        year, category = self.title_keys.pop(title_id, (None, None))
+        if year in self.years:
+            self.years[year] &= mask
+        if category in self.categories:
+            self.categories[category] &= mask
+        self.clear_genres(title_id)
+
+    def apply(self, change, *args):
+        """Изменяет индекс на месте вслед за записью в БД.
+
+        Если версия в БД ушла дальше, чем на одну запись этого процесса,
+        индекс помечается устаревшим и будет перестроен при обращении.
+        """
+        previous, version = bump_version()
+        with self.lock:
+            if self.stale or previous is None or previous != self.version:
+                self.stale = True
+                return
+            if change is None:
+                self.stale = True
+                return
+            try:
+                change(*args)
+            except KeyError:
+                self.stale = True
+                return
+            self.version = version
+
+    def title_saved(self, title_id, year, category_id):
+        genres = self.title_genres.pop(title_id, set())
+        self.remove_title(title_id)
+        self.add_title(title_id, year, category_id)
+        bit = 1 << title_id
+        for genre in genres:
+            self.genres[genre] |= bit
+        self.title_genres[title_id] = genres
+
+    def year_range(self, year_min=None, year_max=None):
+        bits = 0
+        for year, year_bits in self.years.items():
+            if year_min is not None and year < year_min:
+                continue
+            if year_max is not None and year > year_max:
+                continue
+            bits |= year_bits
+        return bits
+
+    def match(self, genres=(), genre_mode=ANY, categories=(), year=None,
+              year_min=None, year_max=None):
+        """Маска произведений, подходящих под все переданные условия."""
+        self.ensure_fresh()
+        with self.lock:
+            bits = self.all
+            if genres:
+                masks = [self.genres.get(slug, 0) for slug in genres]
+                if genre_mode == ALL:
+                    for mask in masks:
+                        bits &= mask
+                else:
+                    union = 0
+                    for mask in masks:
+                        union |= mask
+                    bits &= union
+            if categories:
+                union = 0
+                for slug in categories:
+                    union |= self.categories.get(slug, 0)
+                bits &= union
+            if year is not None:
+                bits &= self.years.get(year, 0)
+            if year_min is not None or year_max is not None:
+                bits &= self.year_range(year_min, year_max)
+            return bits
+
+    def facet_counts(self, bits, year_bucket):
+        """Число произведений из маски bits по жанрам, категориям
+        и интервалам лет длиной year_bucket."""
+        with self.lock:
+            genres = {
+                slug: bit_count(mask & bits)
+                for slug, mask in self.genres.items()
+            }
+            categories = {
+                slug: bit_count(mask & bits)
+                for slug, mask in self.categories.items()
+            }
+            years = {}
+            for year, mask in self.years.items():
+                bucket = year - year % year_bucket
+                years[bucket] = years.get(bucket, 0) + bit_count(mask & bits)
+        return genres, categories, years
+
+
+title_index = TitleBitmapIndex()
@@ -0,0 +1,64 @@
+"""Кэш пользователей для аутентификации по JWT.
+
+Пользователь и версия его прав (token_version) хранятся по id
+в SHARED_CACHE, общем для процессов на хосте, не дольше
+USER_CACHE_TIMEOUT и TOKEN_VERSION_TIMEOUT секунд соответственно;
+версия кэшируется и при отключённом кэше пользователей, чтобы токен
+с ролью не требовал запроса к БД. При сохранении или удалении пользователя
+записи удаляются сигналами, и смена роли или блокировка действуют
+со следующего запроса в любом процессе.
+В кэше лежат только поля CACHED_FIELDS (без пароля и личных данных),
+из них собирается ClaimsUser, как из утверждений токена.
+Изменения через QuerySet.update() сигналов не вызывают и видны
+только после истечения срока записи.
+"""
+from api_yamdb.cache import shared_cache
+from api_yamdb.settings import TOKEN_VERSION_TIMEOUT, USER_CACHE_TIMEOUT
+from reviews.models import ClaimsUser, CustomUser
+
+CACHED_FIELDS = (
+    'id', 'username', 'role', 'is_staff', 'is_superuser', 'is_active'
+)
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def token_version_key(user_id):
+    return f'auth-token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    """Текущая версия прав пользователя или None, если его нет."""
+    key = token_version_key(user_id)
+    version = shared_cache().get(key) if TOKEN_VERSION_TIMEOUT else None
+    if version is None:
+        version = CustomUser.objects.filter(pk=user_id).values_list(
+            'token_version', flat=True
+        ).first()
+        if version is not None and TOKEN_VERSION_TIMEOUT:
+            shared_cache().set(key, version, TOKEN_VERSION_TIMEOUT)
+    return version
+
+
+def get_cached_user(user_id):
+    if not USER_CACHE_TIMEOUT:
+        return None
+    fields = shared_cache().get(user_cache_key(user_id))
+    return None if fields is None else ClaimsUser(**fields)
+
+
+def cache_user(user):
+    if USER_CACHE_TIMEOUT:
+        shared_cache().set(
+            user_cache_key(user.pk),
+            {field: getattr(user, field) for field in CACHED_FIELDS},
+            USER_CACHE_TIMEOUT
+        )
+
+
+def invalidate_user(user_id):
+    shared_cache().delete_many(
+        [user_cache_key(user_id), token_version_key(user_id)]
+    )
@@ -0,0 +1,82 @@
+"""Имена авторов отзывов и комментариев по id пользователя.
+
+Без кэша имена авторов выбираются соединением в запросе страницы.
+При USERNAME_CACHE_TIMEOUT > 0 соединение не делается: имена страницы
+берутся из памяти процесса, недостающие загружаются одним запросом.
+В кэше не больше USERNAME_CACHE_SIZE имён, вытесняется самое старое.
+Смена имени или удаление пользователя увеличивает поколение кэша
+в SHARED_CACHE; процесс, увидевший новое поколение, очищает свои
+записи, поэтому новое имя видно со следующего запроса в любом процессе.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from api_yamdb.cache import shared_cache
+from api_yamdb.settings import USERNAME_CACHE_SIZE, USERNAME_CACHE_TIMEOUT
+from reviews.models import CustomUser
+
+GENERATION_KEY = 'usernames:generation'
+
+
+class UsernameCache:
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.generation = None
+
+    @property
+    def enabled(self):
+        return USERNAME_CACHE_TIMEOUT > 0
+
+    def get_many(self, user_ids):
+        """Словарь {id: имя}; отсутствующие в кэше загружаются разом."""
+        now = time.monotonic()
+        generation = shared_cache().get(GENERATION_KEY, 0)
+        result = {}
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+            for user_id in user_ids:
+                entry = self.entries.get(user_id)
+                if entry is not None and entry[1] > now:
+                    result[user_id] = entry[0]
+        missing = set(user_ids) - result.keys()
+        if not missing:
+            return result
+        loaded = dict(CustomUser.objects.filter(
+            pk__in=missing
+        ).values_list('pk', 'username'))
+        expires = now + USERNAME_CACHE_TIMEOUT
+        with self.lock:
+            for user_id, username in loaded.items():
+                self.entries.pop(user_id, None)
+                self.entries[user_id] = (username, expires)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        result.update(loaded)
+        return result
+
+    def invalidate(self, user_id):
+        """Сбрасывает имена во всех процессах."""
+        with self.lock:
+            self.entries.pop(user_id, None)
+        if not self.enabled:
+            return
+        cache = shared_cache()
+        cache.add(GENERATION_KEY, 0, None)
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            # запись удалили между add и incr
+            cache.add(GENERATION_KEY, 1, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+usernames = UsernameCache(USERNAME_CACHE_SIZE)
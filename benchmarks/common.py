@@ -0,0 +1,66 @@
+"""Общая настройка Django для бенчмарков.
+
+Бенчмарки запускаются из корня репозитория, например:
+python benchmarks/title_search.py --titles 100000
+Данные создаются в отдельной тестовой БД, а общий кэш и файлы метрик —
+во временном каталоге, поэтому рабочие БД, кэш и метрики
+не затрагиваются.
+"""
+import atexit
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api_yamdb'
+)
+
+
+def setup_django():
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment
+    from api import metrics
+    from api_yamdb.settings import SHARED_CACHE
+    setup_test_environment()
+    caches = {**settings.CACHES}
+    location = tempfile.mkdtemp(
+        dir='/dev/shm' if os.path.isdir('/dev/shm') else None
+    )
+    atexit.register(shutil.rmtree, location, ignore_errors=True)
+    caches[SHARED_CACHE] = {
+        **caches[SHARED_CACHE], 'LOCATION': os.path.join(location, 'cache')
+    }
+    metrics.store = metrics.MmapStore(os.path.join(location, 'metrics'))
+    override_settings(CACHES=caches).enable()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def measure(func, repeat=20):
+    """Запускает func repeat раз и возвращает времена в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentiles(timings):
+    """p50, p95 и p99 в миллисекундах."""
+    if len(timings) < 2:
+        return timings * 3
+    cuts = statistics.quantiles(timings, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+
+def report(name, timings):
+    print(f'{name:<40} median {statistics.median(timings):9.3f} ms  '
+          f'min {min(timings):9.3f} ms')
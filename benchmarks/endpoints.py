@@ -0,0 +1,259 @@
+"""Задержка, число запросов к БД и выделения памяти на эндпоинтах /api/v1/.
+
+Данные создаются командой generate_data в тестовой БД, запросы идут
+через тестовый клиент Django внутри процесса. Результаты сохраняются
+в JSON; с --compare текущий прогон сравнивается с сохранённым, и при
+регрессии скрипт завершается с кодом 1:
+python benchmarks/endpoints.py --output base.json
+python benchmarks/endpoints.py --compare base.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from itertools import count
+
+from common import percentiles, setup_django
+
+STATUS_OK = 200
+STATUS_CREATED = 201
+
+
+def title_scenarios(title_id):
+    lists = {
+        'titles': {},
+        'titles ?genre': {'genre': 'genre-1'},
+        'titles ?genre any': {'genre': 'genre-1,genre-2'},
+        'titles ?genre all': {'genre': 'genre-1,genre-2',
+                              'genre_mode': 'all'},
+        'titles ?genre_prefix': {'genre_prefix': 'genre-1'},
+        'titles ?genre_contains': {'genre_contains': 'nre-1'},
+        'titles ?category': {'category': 'category-1'},
+        'titles ?year': {'year': 2020},
+        'titles ?year_min&year_max': {'year_min': 2000, 'year_max': 2010},
+        'titles ?name': {'name': 'тайна'},
+        'titles ?search': {'search': 'тайна'},
+        'titles ?facets': {'facets': 1},
+        'titles ?ordering=-year': {'ordering': '-year'},
+        'titles ?ordering=-rating': {'ordering': '-rating'},
+        'titles ?pagination=cursor': {'pagination': 'cursor'},
+        'titles ?pagination=cursor&ordering=-rating': {
+            'pagination': 'cursor', 'ordering': '-rating'
+        },
+    }
+    for name, params in lists.items():
+        yield name, 'get', '/api/v1/titles/', params, STATUS_OK
+    yield ('title detail', 'get', f'/api/v1/titles/{title_id}/', {},
+           STATUS_OK)
+
+
+def nested_scenarios(title_id, review_id):
+    reviews = f'/api/v1/titles/{title_id}/reviews/'
+    comments = f'{reviews}{review_id}/comments/'
+    for name, path in (('reviews', reviews), ('comments', comments)):
+        yield name, 'get', path, {}, STATUS_OK
+        yield (f'{name} ?pagination=cursor', 'get', path,
+               {'pagination': 'cursor'}, STATUS_OK)
+        yield (f'{name} ?page=2', 'get', path, {'page': 2}, STATUS_OK)
+    yield 'review detail', 'get', f'{reviews}{review_id}/', {}, STATUS_OK
+
+
+def write_scenarios(user):
+    """Каждый вызов params() даёт новые данные, чтобы повторные запросы
+    не упирались в ограничения уникальности."""
+    from reviews.confirmation_codes import code_store
+    from reviews.models import Title
+    code = code_store().issue(user.pk)
+    titles = iter(
+        Title.objects.exclude(reviews__author=user)
+        .values_list('pk', flat=True).order_by('pk')
+    )
+    numbers = count()
+
+    def review():
+        return f'/api/v1/titles/{next(titles)}/reviews/', {
+            'text': 'Бенчмарк', 'score': 7
+        }
+
+    def signup():
+        number = next(numbers)
+        return '/api/v1/auth/signup/', {
+            'username': f'bench{number}',
+            'email': f'bench{number}@yamdb.fake',
+        }
+
+    def token():
+        return '/api/v1/auth/token/', {
+            'username': user.username,
+            'confirmation_code': code,
+        }
+
+    yield 'review create', 'post', review, None, STATUS_CREATED
+    yield 'auth signup', 'post', signup, None, STATUS_OK
+    yield 'auth token', 'post', token, None, STATUS_OK
+
+
+def make_request(client, method, path, params, expected):
+    if callable(path):
+        path, params = path()
+    if method == 'get':
+        response = client.get(path, params)
+    else:
+        response = client.post(path, params, content_type='application/json')
+    if response.status_code != expected:
+        raise RuntimeError(
+            f'{method.upper()} {path}: {response.status_code} '
+            f'вместо {expected}'
+        )
+
+
+def run_scenario(client, scenario, repeat, warmup):
+    from django.db import connection
+
+    from api.middleware import QueryCounter
+
+    for _ in range(warmup):
+        make_request(client, *scenario)
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        make_request(client, *scenario)
+    tracemalloc.start()
+    make_request(client, *scenario)
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        make_request(client, *scenario)
+        timings.append((time.perf_counter() - started) * 1000)
+    p50, p95, p99 = percentiles(timings)
+    return {
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'p99_ms': round(p99, 3),
+        'rps': round(len(timings) / (sum(timings) / 1000), 1),
+        'queries': queries.count,
+        'peak_alloc_kib': round(allocated / 1024, 1),
+    }
+
+
+def benchmark_user():
+    from reviews.models import CustomUser
+    user = CustomUser.objects.create(
+        username='benchmark', email='benchmark@yamdb.fake',
+    )
+    return user
+
+
+def busiest_review():
+    from django.db.models import Count
+    from reviews.models import Review
+    return Review.objects.annotate(
+        comment_count=Count('comments')
+    ).order_by('-comment_count').values_list('title_id', 'pk').first()
+
+
+def compare(results, baseline, threshold):
+    """Печатает изменения относительно baseline и возвращает
+    список регрессий."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = current['p95_ms'] / base['p95_ms'] - 1
+        flags = []
+        if change > threshold:
+            flags.append(f'p95 +{change:.0%}')
+        if current['queries'] > base['queries']:
+            flags.append(f'queries {base["queries"]} -> {current["queries"]}')
+        if current['peak_alloc_kib'] > base['peak_alloc_kib'] * (
+            1 + threshold
+        ):
+            flags.append('alloc')
+        print(f'{name:<45} p95 {base["p95_ms"]:9.3f} -> '
+              f'{current["p95_ms"]:9.3f} ms ({change:+.0%})'
+              + (f'  REGRESSION: {", ".join(flags)}' if flags else ''))
+        if flags:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--titles', type=int, default=2000)
+    parser.add_argument('--reviews', type=int, default=50000)
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', help='Только сценарии с этой подстрокой')
+    parser.add_argument('--output', help='Сохранить результаты в JSON')
+    parser.add_argument('--compare', help='Сравнить с сохранённым JSON')
+    parser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help='Допустимый рост p95 и памяти (по умолчанию 0.2 = 20%%)'
+    )
+    args = parser.parse_args()
+    setup_django()
+
+    import django
+    from django.core.management import call_command
+    from django.test import Client
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api import throttling
+
+    # Сценарии повторяют запросы одного клиента, лимиты бы их отклонили;
+    # стоимость лимитов меряет benchmarks/throttling.py
+    throttling.THROTTLE = False
+    call_command(
+        'generate_data', '--database', '--users', str(args.users),
+        '--titles', str(args.titles), '--reviews', str(args.reviews),
+        '--comments', str(args.comments), '--seed', str(args.seed),
+    )
+    user = benchmark_user()
+    client = Client(HTTP_AUTHORIZATION='Bearer {}'.format(
+        RefreshToken.for_user(user).access_token
+    ))
+    title_id, review_id = busiest_review()
+    scenarios = [
+        *title_scenarios(title_id),
+        *nested_scenarios(title_id, review_id),
+        *write_scenarios(user),
+    ]
+    results = {}
+    for scenario in scenarios:
+        name = scenario[0]
+        if args.only and args.only not in name:
+            continue
+        result = run_scenario(client, scenario[1:], args.repeat, args.warmup)
+        results[name] = result
+        print(f'{name:<45} p50 {result["p50_ms"]:8.3f}  '
+              f'p95 {result["p95_ms"]:8.3f}  p99 {result["p99_ms"]:8.3f} ms  '
+              f'{result["queries"]:3} queries  '
+              f'{result["peak_alloc_kib"]:8.1f} KiB')
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as f:
+            json.dump({
+                'meta': {
+                    **vars(args),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                },
+                'results': results,
+            }, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'Регрессии: {len(regressions)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Накладные расходы ограничения частоты запросов.
+
+Меряет проверку AuthThrottle для пропущенного и отклонённого запроса
+на файловом кэше THROTTLE_CACHE и на кэше в памяти процесса, а также
+полный запрос к /api/v1/auth/token/ без ограничения и отклонённый.
+"""
+import argparse
+import logging
+
+from common import measure, report, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='Запросов в одном замере')
+    parser.add_argument('--clients', type=int, default=1000,
+                        help='Разных адресов и имён пользователей')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    setup_django()
+
+    from django.core.cache import caches
+    from django.test import Client, RequestFactory
+    from rest_framework.parsers import JSONParser
+    from rest_framework.request import Request
+
+    from api import throttling
+    from api_yamdb.settings import THROTTLE_CACHE
+    from reviews.models import CustomUser
+
+    factory = RequestFactory()
+    requests = [
+        Request(factory.post(
+            '/api/v1/auth/token/',
+            {'username': f'user{number}', 'confirmation_code': 1},
+            content_type='application/json',
+            REMOTE_ADDR=f'10.0.{number // 256 % 256}.{number % 256}',
+        ), parsers=[JSONParser()])
+        for number in range(args.clients)
+    ]
+    for request in requests:
+        request.data
+
+    def checks(rates):
+        def run():
+            throttling.THROTTLE_RATES = rates
+            throttle = throttling.AuthThrottle()
+            for number in range(args.requests):
+                throttle.allow_request(requests[number % args.clients], None)
+        return run
+
+    unlimited = {'auth_address': f'{10 ** 9}/min',
+                 'auth_username': f'{10 ** 9}/min'}
+    rejected = {'auth_address': '1/min', 'auth_username': '1/min'}
+    print(f'{args.requests} проверок на замер, {args.clients} клиентов')
+    for alias in (THROTTLE_CACHE, 'default'):
+        throttling.THROTTLE_CACHE = alias
+        caches[alias].clear()
+        report(f'{alias}: пропущенные',
+               measure(checks(unlimited), args.repeat))
+        report(f'{alias}: отклонённые',
+               measure(checks(rejected), args.repeat))
+        caches[alias].clear()
+
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    CustomUser.objects.create(username='user0', email='user0@yamdb.fake')
+    client = Client()
+    data = {'username': 'user0', 'confirmation_code': 1}
+
+    def token():
+        client.post('/api/v1/auth/token/', data)
+
+    throttling.THROTTLE_CACHE = THROTTLE_CACHE
+    throttling.THROTTLE = False
+    report('token без ограничения', measure(token, args.repeat))
+    throttling.THROTTLE = True
+    throttling.THROTTLE_RATES = rejected
+    token()
+    report('token отклонён', measure(token, args.repeat))
+    caches[THROTTLE_CACHE].clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Сравнение поиска произведений: name__contains против FTS5."""
+import argparse
+import random
+
+from common import measure, report, setup_django
+
+SYLLABLES = 'ка ро ми ту ле на во си да пе лу го ре зи мо'.split()
+WORDS = sorted({
+    ''.join(random.Random(index).choices(SYLLABLES, k=3))
+    for index in range(5000)
+})
+
+
+def fill_titles(count, seed):
+    from reviews.models import Title
+    rnd = random.Random(seed)
+    batch = []
+    for index in range(count):
+        batch.append(Title(
+            name=' '.join(rnd.choices(WORDS, k=3)),
+            year=rnd.randint(1900, 2020),
+            description=' '.join(rnd.choices(WORDS, k=20)),
+        ))
+        if len(batch) == 5000:
+            Title.objects.bulk_create(batch)
+            batch = []
+    Title.objects.bulk_create(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    setup_django()
+
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+
+    from api.filters import TitleFilter, TitleSearchFilter
+    from reviews.models import Title
+
+    fill_titles(args.titles, args.seed)
+    factory = RequestFactory()
+    print(f'{args.titles} произведений, {args.repeat} повторов')
+    rnd = random.Random(args.seed)
+    for word in rnd.sample(WORDS, 2) + [' '.join(rnd.sample(WORDS, 2))]:
+        def contains():
+            queryset = TitleFilter(
+                {'name': word}, queryset=Title.objects.all()
+            ).qs
+            return queryset.count(), list(queryset[:10])
+
+        def search():
+            request = Request(factory.get('/', {'search': word}))
+            queryset = TitleSearchFilter().filter_queryset(
+                request, Title.objects.all(), None
+            )
+            return queryset.count(), list(queryset[:10])
+
+        report(f'contains "{word}" ({contains()[0]})',
+               measure(contains, args.repeat))
+        report(f'fts5 "{word}" ({search()[0]})',
+               measure(search, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
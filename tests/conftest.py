@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -34,3 +35,40 @@ assert get_version() < '3.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def shared_cache_dir(tmp_path_factory):
+    # общий кэш тестов не должен смешиваться с кэшем запущенного сервера
+    from django.conf import settings
+    from django.test import override_settings
+    from api_yamdb.settings import SHARED_CACHE
+
+    caches = {
+        **settings.CACHES,
+        SHARED_CACHE: {
+            **settings.CACHES[SHARED_CACHE],
+            'LOCATION': str(tmp_path_factory.mktemp('shared_cache')),
+        },
+    }
+    with override_settings(CACHES=caches):
+        yield
+
+
+@pytest.fixture(scope='session', autouse=True)
+def metrics_dir(tmp_path_factory):
+    # файлы метрик тестов не должны попадать в каталог сервера
+    from api import metrics
+
+    store = metrics.store
+    metrics.store = metrics.MmapStore(
+        str(tmp_path_factory.mktemp('metrics'))
+    )
+    yield
+    metrics.store = store
+
+
+@pytest.fixture(autouse=True)
+def clear_shared_cache(shared_cache_dir):
+    from api_yamdb.cache import shared_cache
+    shared_cache().clear()
@@ -0,0 +1,79 @@
+import pytest
+
+from .common import auth_client, create_reviews
+
+
+class Test08TitleRating:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_follows_reviews(self, admin_client, admin):
+        from reviews.models import Title
+
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.review_count) == (12, 3), (
+            'Проверьте, что при создании отзыва обновляются сумма оценок '
+            'и количество отзывов произведения'
+        )
+        assert title.rating == 4, (
+            'Проверьте, что рейтинг произведения равен средней оценке'
+        )
+
+        auth_client(user).patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/',
+            data={'score': 9}
+        )
+        title.refresh_from_db()
+        assert (title.score_sum, title.review_count) == (18, 3), (
+            'Проверьте, что при изменении оценки пересчитывается рейтинг'
+        )
+
+        admin_client.delete(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+        )
+        title.refresh_from_db()
+        assert (title.score_sum, title.review_count) == (13, 2), (
+            'Проверьте, что при удалении отзыва пересчитывается рейтинг'
+        )
+
+        admin_client.delete(f'/api/v1/users/{moderator.username}/')
+        title.refresh_from_db()
+        assert (title.score_sum, title.review_count) == (9, 1), (
+            'Проверьте, что при удалении автора пересчитывается рейтинг'
+        )
+
+        user.delete()
+        title.refresh_from_db()
+        assert (title.score_sum, title.review_count) == (0, 0), (
+            'Проверьте, что при удалении всех отзывов счётчики обнуляются'
+        )
+        assert title.rating is None, (
+            'Проверьте, что рейтинг произведения без отзывов равен `None`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_save_keeps_rating(self, admin_client, admin):
+        from reviews.models import Title
+
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        stale = Title.objects.get(pk=title.pk)
+        stale.score_sum = stale.review_count = 0
+        stale.rating = None
+        stale.name = 'Новое название'
+        stale.save()
+        title.refresh_from_db()
+        assert title.name == 'Новое название'
+        assert (title.score_sum, title.review_count) == (12, 3), (
+            'Проверьте, что сохранение произведения не перезаписывает '
+            'счётчики отзывов'
+        )
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.pk}/', data={'year': 1999}
+        )
+        assert response.status_code == 200
+        title.refresh_from_db()
+        assert (title.year, title.rating) == (1999, 4), (
+            'Проверьте, что изменение произведения через API '
+            'не сбрасывает рейтинг'
+        )
@@ -0,0 +1,50 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+def add_titles(admin_client, titles, amount):
+    for index in range(amount):
+        admin_client.post('/api/v1/titles/', data={
+            'name': f'Произведение {index}',
+            'year': 2000 + index,
+            'genre': titles[0]['genre'],
+            'category': titles[0]['category'],
+        })
+
+
+class Test09TitleQueries:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_list_queries(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        few = count_queries(client, '/api/v1/titles/')
+        add_titles(admin_client, titles, 8)
+        many = count_queries(client, '/api/v1/titles/')
+        assert many == few, (
+            'Проверьте, что количество запросов к БД при GET запросе '
+            '`/api/v1/titles/` не зависит от количества произведений '
+            f'на странице: {few} запросов для 2 и {many} для 10'
+        )
+        assert many <= 3, (
+            'Проверьте, что страница `/api/v1/titles/` загружается '
+            'не более чем за 3 запроса к БД'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_detail_queries(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        queries = count_queries(client, f'/api/v1/titles/{titles[0]["id"]}/')
+        assert queries <= 2, (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/` '
+            'выполняет не более 2 запросов к БД'
+        )
@@ -0,0 +1,149 @@
+import json
+from base64 import urlsafe_b64encode
+
+import pytest
+from django.utils import timezone
+
+from .common import create_reviews
+
+
+def tampered_cursor(*values):
+    return urlsafe_b64encode(json.dumps({'v': values}).encode()).decode()
+
+
+def walk(client, url, direction='next'):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что GET запрос `{url}` возвращает статус 200'
+        )
+        data = response.json()
+        pages.append(data)
+        url = data[direction]
+    return pages
+
+
+class Test10CursorPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_comments_cursor(self, client, admin_client, admin):
+        from reviews.models import Comment
+
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        review_id = reviews[0]['id']
+        Comment.objects.bulk_create(
+            Comment(text=f'Комментарий {i}', author=admin, review_id=review_id)
+            for i in range(23)
+        )
+        same_date = timezone.now()
+        tied = list(Comment.objects.order_by('pk').values_list('pk', flat=True)[:12])
+        Comment.objects.filter(pk__in=tied).update(pub_date=same_date)
+        expected = list(
+            Comment.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+        url = (f'/api/v1/titles/{titles[0]["id"]}/reviews/{review_id}'
+               '/comments/?pagination=cursor')
+        pages = walk(client, url)
+        assert 'count' not in pages[0], (
+            'Проверьте, что курсорная пагинация не возвращает `count`'
+        )
+        assert [len(page['results']) for page in pages] == [10, 10, 3]
+        ids = [item['id'] for page in pages for item in page['results']]
+        assert ids == expected, (
+            'Проверьте, что курсорная пагинация отдаёт все комментарии '
+            'по одному разу в порядке (-pub_date, -id)'
+        )
+        backward = walk(client, pages[-1]['previous'], 'previous')
+        assert [item['id'] for item in backward[0]['results']] == ids[10:20]
+        assert [item['id'] for item in backward[1]['results']] == ids[:10]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_cursor(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url, {'pagination': 'cursor'})
+        data = response.json()
+        assert set(data) == {'next', 'previous', 'results'}
+        assert len(data['results']) == len(reviews)
+        response = client.get(url, {'cursor': 'не курсор'})
+        assert response.status_code == 404, (
+            'Проверьте, что неверный курсор возвращает статус 404'
+        )
+        for values in (({'a': 1}, 1), ('notadate', 1),
+                       (timezone.now().isoformat(), 'x'), ([1], 1)):
+            response = client.get(url, {'cursor': tampered_cursor(*values)})
+            assert response.status_code == 404, (
+                'Проверьте, что курсор со значениями не того типа '
+                'возвращает статус 404'
+            )
+        response = client.get(url)
+        assert 'count' in response.json(), (
+            'Проверьте, что постраничная пагинация остаётся по умолчанию'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_titles_cursor(self, client):
+        from reviews.models import Title
+
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {i % 4}', year=1990 + i % 3,
+                  rating=None if i % 5 == 0 else i % 7)
+            for i in range(25)
+        )
+        for ordering in ('name', '-name', 'year', '-year', 'rating',
+                         '-rating', '-rating,name'):
+            fields = ordering.split(',')
+            tie = '-id' if fields[-1].startswith('-') else 'id'
+            expected = list(
+                Title.objects.order_by(*fields, tie)
+                .values_list('id', flat=True)
+            )
+            pages = walk(
+                client,
+                f'/api/v1/titles/?pagination=cursor&ordering={ordering}'
+            )
+            ids = [item['id'] for page in pages for item in page['results']]
+            assert ids == expected, (
+                'Проверьте, что курсорная пагинация `/api/v1/titles/` '
+                f'отдаёт все произведения при сортировке {ordering}'
+            )
+            backward = walk(client, pages[-1]['previous'], 'previous')
+            ids = [item['id'] for page in reversed(backward)
+                   for item in page['results']]
+            assert ids == expected[:20]
+        response = client.get(
+            '/api/v1/titles/', {'pagination': 'cursor', 'ordering': 'genre'}
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что курсорная пагинация произведений отклоняет '
+            'сортировку по неподдерживаемому полю'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_titles_tampered_cursor(self, client):
+        from reviews.models import Title
+
+        Title.objects.create(name='Произведение', year=2000, rating=5)
+        for ordering, values in (('rating', ('x', 1)),
+                                 ('rating', ({'a': 1}, 1)),
+                                 ('rating', (float('nan'), 1)),
+                                 ('-year', (None, 1)),
+                                 ('name', ('Произведение', None)),
+                                 ('year', ('2000.5', 1))):
+            response = client.get('/api/v1/titles/', {
+                'pagination': 'cursor', 'ordering': ordering,
+                'cursor': tampered_cursor(*values),
+            })
+            assert response.status_code == 404, (
+                'Проверьте, что значения курсора произведений проверяются '
+                f'по полям сортировки {ordering}'
+            )
+        response = client.get('/api/v1/titles/', {
+            'pagination': 'cursor', 'ordering': '-rating',
+            'cursor': tampered_cursor(None, 10 ** 6),
+        })
+        assert response.status_code == 200, (
+            'Проверьте, что курсор с пустым рейтингом допустим'
+        )
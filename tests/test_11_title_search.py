@@ -0,0 +1,64 @@
+import pytest
+
+from .common import create_titles
+
+
+def search(client, text, **params):
+    response = client.get('/api/v1/titles/', {'search': text, **params})
+    assert response.status_code == 200, (
+        'Проверьте, что GET запрос `/api/v1/titles/?search=` '
+        'возвращает статус 200'
+    )
+    return [title['id'] for title in response.json()['results']]
+
+
+class Test11TitleSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search_name_and_description(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        assert search(client, 'поворот') == [titles[0]['id']], (
+            'Проверьте, что `?search=` ищет по названию без учёта регистра'
+        )
+        assert search(client, 'драма') == [titles[1]['id']], (
+            'Проверьте, что `?search=` ищет по описанию'
+        )
+        assert search(client, 'прое') == [titles[1]['id']], (
+            'Проверьте, что `?search=` ищет слова по префиксу'
+        )
+        assert search(client, '"(*') == [t['id'] for t in sorted(
+            titles, key=lambda title: title['name'])], (
+            'Проверьте, что строка без слов не фильтрует произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_ranking(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        data = {'name': 'Драма драма', 'year': 2001, 'genre': ['drama'],
+                'category': 'books', 'description': 'Снова драма'}
+        best = admin_client.post('/api/v1/titles/', data=data).json()['id']
+        assert search(client, 'драма') == [best, titles[1]['id']], (
+            'Проверьте, что результаты `?search=` упорядочены '
+            'по релевантности'
+        )
+        assert search(client, 'драма', ordering='-year') == [
+            titles[1]['id'], best], (
+            'Проверьте, что `?ordering=` меняет порядок результатов поиска'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_search_follows_writes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/',
+            data={'description': 'Новый сюжет'}
+        )
+        assert search(client, 'пике') == []
+        assert search(client, 'сюжет') == [titles[0]['id']], (
+            'Проверьте, что индекс поиска обновляется при изменении '
+            'произведения'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert search(client, 'сюжет') == [], (
+            'Проверьте, что удалённые произведения не находятся поиском'
+        )
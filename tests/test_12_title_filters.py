@@ -0,0 +1,59 @@
+import pytest
+
+from .common import create_titles
+
+
+def filter_titles(client, **params):
+    response = client.get('/api/v1/titles/', params)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET запрос `/api/v1/titles/` с параметрами {params} '
+        'возвращает статус 200'
+    )
+    return sorted(title['id'] for title in response.json()['results'])
+
+
+class Test12TitleFilters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_genre_filters(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        assert filter_titles(client, genre='com') == [], (
+            'Проверьте, что `?genre=` сравнивает slug жанра целиком'
+        )
+        assert filter_titles(client, genre='comedy,drama') == [
+            first, second], (
+            'Проверьте, что `?genre=a,b` возвращает произведения '
+            'с любым из жанров'
+        )
+        assert filter_titles(
+            client, genre='horror,comedy', genre_mode='all') == [first], (
+            'Проверьте, что `?genre_mode=all` требует все жанры'
+        )
+        assert filter_titles(
+            client, genre='horror,drama', genre_mode='all') == []
+        assert filter_titles(client, genre_prefix='dr') == [second], (
+            'Проверьте, что `?genre_prefix=` ищет slug жанра по префиксу'
+        )
+        assert filter_titles(client, genre_contains='o') == [first], (
+            'Проверьте, что `?genre_contains=` ищет подстроку в slug и не '
+            'дублирует произведения с несколькими подходящими жанрами'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_category_and_year_filters(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        assert filter_titles(client, category='film') == []
+        assert filter_titles(client, category='films,books') == [
+            first, second]
+        assert filter_titles(client, category_prefix='fil') == [first]
+        assert filter_titles(client, category_contains='ook') == [second]
+        assert filter_titles(client, year_min=2001) == [second], (
+            'Проверьте, что `?year_min=` фильтрует по году включительно'
+        )
+        assert filter_titles(client, year_max=2000) == [first], (
+            'Проверьте, что `?year_max=` фильтрует по году включительно'
+        )
+        assert filter_titles(client, year_min=2000, year_max=2020) == [
+            first, second]
@@ -0,0 +1,59 @@
+import pytest
+from django.db.models import F
+
+from .common import create_titles
+
+
+def snapshot(index):
+    return (index.all,) + tuple(
+        {key: bits for key, bits in groups.items() if bits}
+        for groups in (index.genres, index.categories, index.years)
+    )
+
+
+class Test13TitleBitmapIndex:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_incremental_updates_match_rebuild(self, admin_client):
+        from reviews.title_index import TitleBitmapIndex, title_index
+
+        titles, _, _ = create_titles(admin_client)
+        title_index.ensure_fresh()
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/',
+            data={'genre': ['drama'], 'category': 'books', 'year': 1999}
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        admin_client.post('/api/v1/genres/', data={'name': 'Мюзикл',
+                                                   'slug': 'musical'})
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Новое', 'year': 2010, 'genre': ['musical', 'comedy'],
+            'category': 'films'
+        })
+        assert not title_index.stale, (
+            'Проверьте, что записи этого процесса обновляют индекс на месте'
+        )
+        fresh = TitleBitmapIndex()
+        fresh.ensure_fresh()
+        assert snapshot(title_index) == snapshot(fresh), (
+            'Проверьте, что индекс после изменений совпадает '
+            'с перестроенным с нуля'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_foreign_version_forces_rebuild(self, client, admin_client):
+        from reviews.models import IndexVersion, Title
+        from reviews.title_index import INDEX_NAME, title_index
+
+        titles, _, _ = create_titles(admin_client)
+        title_index.ensure_fresh()
+        Title.objects.filter(pk=titles[0]['id']).update(year=1950)
+        IndexVersion.objects.filter(name=INDEX_NAME).update(
+            version=F('version') + 1
+        )
+        response = client.get('/api/v1/titles/', {'year_max': 1960})
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[0]['id']], (
+            'Проверьте, что индекс перестраивается, когда версию '
+            'увеличил другой процесс'
+        )
@@ -0,0 +1,63 @@
+import pytest
+
+from .common import create_titles
+
+
+def get_facets(client, **params):
+    response = client.get('/api/v1/titles/', {'facets': 1, **params})
+    assert response.status_code == 200
+    data = response.json()
+    assert 'facets' in data, (
+        'Проверьте, что GET запрос `/api/v1/titles/?facets=1` '
+        'возвращает счётчики `facets`'
+    )
+    return data['facets']
+
+
+class Test14TitleFacets:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_facets(self, client, admin_client):
+        create_titles(admin_client)
+        assert get_facets(client) == {
+            'genre': {'horror': 1, 'comedy': 1, 'drama': 1},
+            'category': {'films': 1, 'books': 1},
+            'year': {'2000': 1, '2020': 1},
+        }
+        assert get_facets(client, genre='horror,drama', year_min=2010) == {
+            'genre': {'drama': 1},
+            'category': {'books': 1},
+            'year': {'2020': 1},
+        }, (
+            'Проверьте, что фасеты считаются по отфильтрованным произведениям'
+        )
+        assert 'facets' not in client.get('/api/v1/titles/').json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_facets_follow_writes(self, client, admin_client):
+        create_titles(admin_client)
+        assert get_facets(client, category='films')['genre'] == {
+            'horror': 1, 'comedy': 1}
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Ещё', 'year': 2005, 'genre': ['comedy'],
+            'category': 'films'
+        })
+        assert get_facets(client, category='films')['genre'] == {
+            'horror': 1, 'comedy': 2}, (
+            'Проверьте, что кэш фасетов сбрасывается при изменении '
+            'произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_sql_facets_match_bitmap(self, client, admin_client,
+                                        monkeypatch):
+        import api.facets
+
+        create_titles(admin_client)
+        params = {'genre': 'comedy,drama', 'search': 'драма'}
+        bitmap = get_facets(client, **params)
+        monkeypatch.setattr(api.facets, 'TITLE_BITMAP_INDEX', False)
+        assert get_facets(client, **params) == bitmap, (
+            'Проверьте, что фасеты без битового индекса совпадают '
+            'с фасетами по индексу'
+        )
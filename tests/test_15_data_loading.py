@@ -0,0 +1,240 @@
+import os
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Avg
+
+from .conftest import MANAGE_PATH
+
+
+def append_rows(path, *rows):
+    text = path.read_text(encoding='utf8')
+    if not text.endswith('\n'):
+        text += '\n'
+    path.write_text(text + '\n'.join(rows) + '\n', encoding='utf8')
+
+
+class Test15DataLoading:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_loading(self, monkeypatch):
+        from io import StringIO
+
+        from reviews.models import Comment, CustomUser, Review, Title
+
+        monkeypatch.chdir(MANAGE_PATH)
+        call_command('data_loading', '--bulk', '--batch-size', '10',
+                     verbosity=0)
+        counts = (CustomUser.objects.count(), Title.objects.count(),
+                  Review.objects.count(), Comment.objects.count())
+        output = StringIO()
+        call_command('data_loading', '--bulk', stdout=output)
+        assert 'Review: 0 rows' in output.getvalue(), (
+            'Проверьте, что `data_loading --bulk` не считает загруженными '
+            'уже существующие строки'
+        )
+        assert f'{counts[2]} skipped as duplicates' in output.getvalue(), (
+            'Проверьте, что `data_loading --bulk` сообщает число '
+            'пропущенных повторов'
+        )
+        assert counts == (CustomUser.objects.count(), Title.objects.count(),
+                          Review.objects.count(), Comment.objects.count()), (
+            'Проверьте, что повторная загрузка `data_loading --bulk` '
+            'не дублирует записи'
+        )
+        assert all(counts), 'Проверьте, что `data_loading --bulk` загружает данные'
+        for title in Title.objects.annotate(average=Avg('reviews__score')):
+            assert title.rating == title.average, (
+                'Проверьте, что после `data_loading --bulk` '
+                'пересчитывается рейтинг произведений'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_incremental_loading(self, monkeypatch, tmp_path):
+        import csv
+        import shutil
+        from io import StringIO
+
+        from reviews.models import CsvManifest, Review, Title
+
+        data_dir = tmp_path / 'static' / 'data'
+        shutil.copytree(os.path.join(MANAGE_PATH, 'static', 'data'),
+                        data_dir)
+        monkeypatch.chdir(tmp_path)
+        call_command('data_loading', '--incremental', verbosity=0)
+        reviews_count = Review.objects.count()
+
+        path = data_dir / 'review.csv'
+        with open(path, encoding='utf8') as f:
+            rows = list(csv.DictReader(f))
+        changed, removed = rows[0], rows[1]
+        changed['score'] = '1' if changed['score'] != '1' else '2'
+        reviewed = {row['title_id'] for row in rows if row['author'] == '104'}
+        title_id = next(
+            str(pk) for pk in Title.objects.values_list('pk', flat=True)
+            if str(pk) not in reviewed
+        )
+        added = dict(rows[2], id='1000', author='104', title_id=title_id)
+        rows = [changed] + rows[2:] + [added]
+        with open(path, 'w', encoding='utf8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(changed))
+            writer.writeheader()
+            writer.writerows(rows)
+
+        untouched = Title.objects.exclude(
+            pk__in=[changed['title_id'], title_id]
+        ).filter(review_count__gt=0).first()
+        Title.objects.filter(pk=untouched.pk).update(review_count=0)
+        output = StringIO()
+        call_command('data_loading', '--incremental', verbosity=0,
+                     stdout=output)
+        assert 'inserted' not in output.getvalue(), (
+            'Проверьте, что `data_loading --incremental` учитывает '
+            '--verbosity'
+        )
+        assert Title.objects.get(pk=untouched.pk).review_count == 0, (
+            'Проверьте, что `data_loading --incremental` пересчитывает '
+            'рейтинг только произведений с изменёнными отзывами'
+        )
+        Title.objects.filter(pk=untouched.pk).update(
+            review_count=untouched.review_count
+        )
+        CsvManifest.objects.filter(file_name='review.csv').delete()
+        output = StringIO()
+        call_command('data_loading', '--incremental', stdout=output)
+        assert 'Review: 0 inserted, 0 updated, 1 missing in file' in (
+            output.getvalue()
+        )
+        assert Review.objects.filter(pk=removed['id']).exists(), (
+            'Проверьте, что без `--delete` строки, которых нет в файле, '
+            'не удаляются'
+        )
+        CsvManifest.objects.filter(file_name='review.csv').delete()
+
+        output = StringIO()
+        call_command('data_loading', '--incremental', '--delete',
+                     stdout=output)
+        output = output.getvalue()
+        assert 'users.csv not changed' in output, (
+            'Проверьте, что `data_loading --incremental` пропускает '
+            'неизменённые файлы'
+        )
+        assert 'Review: 0 inserted, 0 updated, 1 deleted' in output, (
+            'Проверьте, что `data_loading --incremental` применяет только '
+            'разницу между файлом и таблицей'
+        )
+        assert Review.objects.count() == reviews_count
+        assert Review.objects.get(pk=changed['id']).score == int(
+            changed['score'])
+        assert not Review.objects.filter(pk=removed['id']).exists()
+        for title in Title.objects.annotate(average=Avg('reviews__score')):
+            assert title.rating == title.average, (
+                'Проверьте, что после `data_loading --incremental` '
+                'пересчитывается рейтинг произведений'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_parallel_loading_reports_errors(self, monkeypatch, tmp_path):
+        import shutil
+        from io import StringIO
+
+        from reviews.models import CustomUser, Review, Title
+
+        data_dir = tmp_path / 'static' / 'data'
+        shutil.copytree(os.path.join(MANAGE_PATH, 'static', 'data'),
+                        data_dir)
+        append_rows(data_dir / 'users.csv', '200,me,me@yamdb.fake,user,,,',
+                    '201,bingobongo,other@yamdb.fake,user,,,')
+        append_rows(data_dir / 'titles.csv', '200,Из будущего,3000,1')
+        append_rows(data_dir / 'review.csv',
+                    '200,1,Много,104,11,2020-01-01T00:00:00Z',
+                    '201,1,Никто,999,5,2020-01-01T00:00:00Z',
+                    '202,1,Повтор,100,5,2020-01-01T00:00:00Z')
+        append_rows(data_dir / 'comments.csv',
+                    '200,200,Ответ,100,2020-01-01T00:00:00Z')
+        monkeypatch.chdir(tmp_path)
+        output = StringIO()
+        call_command('data_loading', '--parallel', '--workers', '2',
+                     '--batch-size', '10', stdout=output)
+        output = output.getvalue()
+        for message in ('users.csv: 2 rows rejected',
+                        'titles.csv: 1 rows rejected',
+                        'review.csv: 3 rows rejected',
+                        'comments.csv: 1 rows rejected'):
+            assert message in output, (
+                'Проверьте, что `data_loading --parallel` сообщает '
+                'об ошибочных строках по таблицам'
+            )
+        for message in ('line 8: повтор уникального ключа (username)',
+                        'line 76: повтор уникального ключа (author, title)',
+                        'Review: 72 rows'):
+            assert message in output, (
+                'Проверьте, что `data_loading --parallel` не считает '
+                'загруженными строки, нарушающие уникальность, '
+                'и сообщает их номера'
+            )
+        assert not CustomUser.objects.filter(pk__in=(200, 201)).exists()
+        assert not Title.objects.filter(pk=200).exists()
+        assert not Review.objects.filter(pk__in=(200, 201, 202)).exists()
+        assert Review.objects.count() == 72, (
+            'Проверьте, что ошибочные строки не прерывают загрузку'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_incremental_retries_skipped_rows(self, monkeypatch,
+                                                 tmp_path):
+        import shutil
+        from io import StringIO
+
+        from reviews.models import CsvManifest, Review
+
+        data_dir = tmp_path / 'static' / 'data'
+        shutil.copytree(os.path.join(MANAGE_PATH, 'static', 'data'),
+                        data_dir)
+        append_rows(data_dir / 'review.csv',
+                    '300,1,Позже,300,7,2020-01-01T00:00:00Z')
+        monkeypatch.chdir(tmp_path)
+        output = StringIO()
+        call_command('data_loading', '--incremental', stdout=output)
+        assert 'Review: 72 inserted, 0 updated, 0 missing in file' in (
+            output.getvalue()
+        )
+        assert '1 skipped with unknown references' in output.getvalue(), (
+            'Проверьте, что `data_loading --incremental` сообщает '
+            'о пропущенных строках'
+        )
+        assert not CsvManifest.objects.filter(
+            file_name='review.csv'
+        ).exists(), (
+            'Проверьте, что контрольная сумма файла с пропущенными '
+            'строками не сохраняется'
+        )
+        append_rows(data_dir / 'users.csv', '300,late,late@yamdb.fake,user,,,')
+        call_command('data_loading', '--incremental', verbosity=0)
+        assert Review.objects.filter(pk=300).exists(), (
+            'Проверьте, что пропущенные строки загружаются, когда '
+            'появляется запись, на которую они ссылаются'
+        )
+        assert CsvManifest.objects.filter(file_name='review.csv').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_incremental_skips_duplicates(self, monkeypatch, tmp_path):
+        import shutil
+        from io import StringIO
+
+        from reviews.models import Review
+
+        data_dir = tmp_path / 'static' / 'data'
+        shutil.copytree(os.path.join(MANAGE_PATH, 'static', 'data'),
+                        data_dir)
+        append_rows(data_dir / 'review.csv',
+                    '301,1,Повтор,100,5,2020-01-01T00:00:00Z')
+        monkeypatch.chdir(tmp_path)
+        output = StringIO()
+        call_command('data_loading', '--incremental', stdout=output)
+        assert 'Review: 72 inserted' in output.getvalue()
+        assert '1 skipped as duplicates' in output.getvalue(), (
+            'Проверьте, что `data_loading --incremental` пропускает строки, '
+            'нарушающие уникальность, и сообщает о них'
+        )
+        assert not Review.objects.filter(pk=301).exists()
@@ -0,0 +1,53 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Avg
+
+
+class Test16GenerateData:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_generate_database(self):
+        from reviews.models import Comment, CustomUser, Review, Title
+
+        call_command('generate_data', '--database', '--users', '50',
+                     '--titles', '30', '--reviews', '400', '--comments',
+                     '300', '--batch-size', '64', verbosity=0)
+        assert (CustomUser.objects.count(), Title.objects.count(),
+                Review.objects.count(), Comment.objects.count()) == (
+            50, 30, 400, 300
+        ), 'Проверьте, что `generate_data` создаёт заданное число записей'
+        counts = list(
+            Title.objects.order_by('-review_count')
+            .values_list('review_count', flat=True)
+        )
+        assert counts[0] > 400 / 30 * 2, (
+            'Проверьте, что отзывы распределены по произведениям неравномерно'
+        )
+        for title in Title.objects.annotate(average=Avg('reviews__score')):
+            assert title.rating == title.average, (
+                'Проверьте, что после `generate_data` '
+                'пересчитывается рейтинг произведений'
+            )
+        for comment in Comment.objects.select_related('review')[:50]:
+            assert comment.pub_date >= comment.review.pub_date, (
+                'Проверьте, что комментарий не старше отзыва'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_generate_csv(self, monkeypatch, tmp_path):
+        from reviews.models import Comment, Review
+
+        data_dir = tmp_path / 'static' / 'data'
+        for directory in (data_dir, tmp_path / 'copy'):
+            call_command('generate_data', '--csv', str(directory),
+                         '--users', '20', '--titles', '10', '--reviews',
+                         '100', '--comments', '50', verbosity=0)
+        for name in ('users.csv', 'titles.csv', 'genre_title.csv'):
+            assert (data_dir / name).read_bytes() == (
+                (tmp_path / 'copy' / name).read_bytes()
+            ), 'Проверьте, что `generate_data` воспроизводим при одном seed'
+        monkeypatch.chdir(tmp_path)
+        call_command('data_loading', '--bulk', verbosity=0)
+        assert (Review.objects.count(), Comment.objects.count()) == (
+            100, 50
+        ), 'Проверьте, что csv из `generate_data` загружается data_loading'
@@ -0,0 +1,104 @@
+import pytest
+
+from .common import create_titles
+
+STATS_URL = '/api/v1/stats/sql/'
+
+
+class Test17SqlStats:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_route_summary(self, client, admin_client):
+        create_titles(admin_client)
+        assert admin_client.delete(STATS_URL).status_code == 204
+        for _ in range(3):
+            client.get('/api/v1/titles/')
+        client.get('/api/v1/genres/')
+        response = admin_client.get(STATS_URL)
+        assert response.status_code == 200, (
+            f'Проверьте, что GET запрос `{STATS_URL}` администратора '
+            'возвращает статус 200'
+        )
+        routes = {
+            (route['route'], route['action']): route
+            for route in response.json()
+        }
+        titles = routes.get(('api/v1/titles/', 'list'))
+        assert titles is not None, (
+            'Проверьте, что сводка группирует запросы по маршруту и действию'
+        )
+        assert titles['requests'] == 3
+        assert titles['queries'] == titles['avg_queries'] * 3
+        assert titles['max_queries'] > 0 and titles['sql_ms'] > 0
+        assert ('api/v1/genres/', 'list') in routes
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_admin_only(self, client, user_client):
+        assert client.get(STATS_URL).status_code == 401
+        assert user_client.get(STATS_URL).status_code == 403, (
+            f'Проверьте, что `{STATS_URL}` доступен только администратору'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_headers(self, client, monkeypatch):
+        from api import middleware
+
+        assert 'X-SQL-Queries' not in client.get('/api/v1/titles/')
+        monkeypatch.setattr(middleware, 'SQL_STATS_HEADERS', True)
+        response = client.get('/api/v1/titles/')
+        assert int(response['X-SQL-Queries']) > 0, (
+            'Проверьте, что при SQL_STATS_HEADERS ответ содержит '
+            'число SQL-запросов'
+        )
+        assert float(response['X-SQL-Time-Ms']) >= 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_slow_queries(self, client, admin_client, monkeypatch):
+        from api.slow_queries import slow_query_log
+
+        create_titles(admin_client)
+        url = '/api/v1/stats/slow-queries/'
+        assert client.get(url).status_code == 401
+        assert admin_client.delete(url).status_code == 204
+        monkeypatch.setattr(slow_query_log, 'threshold', 0)
+        client.get('/api/v1/titles/', {'ordering': 'description',
+                                       'name': 'Проект'})
+        monkeypatch.setattr(slow_query_log, 'threshold', None)
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        entries = [
+            entry for entry in response.json()
+            if 'description' in entry['sql']
+        ]
+        assert entries, 'Проверьте, что медленные запросы попадают в журнал'
+        entry = entries[0]
+        assert (entry['route'], entry['action'], entry['view']) == (
+            'api/v1/titles/', 'list', 'titles-list'
+        ), 'Проверьте, что запрос в журнале привязан к маршруту'
+        assert 'Проект' not in str(entry['params']), (
+            'Проверьте, что значения параметров скрыты'
+        )
+        assert entry['plan'], (
+            'Проверьте, что для медленного запроса сохраняется план'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_slow_queries_without_stats(self, monkeypatch):
+        from django.test import Client
+
+        from api import middleware
+        from api.slow_queries import slow_query_log
+
+        middleware.sql_stats.reset()
+        slow_query_log.reset()
+        monkeypatch.setattr(middleware, 'SQL_STATS', False)
+        monkeypatch.setattr(slow_query_log, 'threshold', 0)
+        Client().get('/api/v1/titles/')
+        monkeypatch.setattr(slow_query_log, 'threshold', None)
+        assert slow_query_log.recent(), (
+            'Проверьте, что журнал медленных запросов ведётся и при '
+            'выключенном SQL_STATS'
+        )
+        assert not middleware.sql_stats.summary(), (
+            'Проверьте, что при выключенном SQL_STATS сводка не собирается'
+        )
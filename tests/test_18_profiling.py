@@ -0,0 +1,82 @@
+import pytest
+from django.test import Client
+
+from .common import create_titles
+
+PROFILES_URL = '/api/v1/stats/profiles/'
+
+
+class Test18Profiling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_profile_by_header(self, admin_client, token_admin,
+                                  monkeypatch):
+        from api import middleware
+        from api.profiling import sampler
+
+        create_titles(admin_client)
+        assert admin_client.delete(PROFILES_URL).status_code == 204
+        monkeypatch.setattr(middleware, 'PROFILING', True)
+        monkeypatch.setattr(middleware, 'PROFILE_SAMPLE_RATE', 0)
+        monkeypatch.setattr(sampler, 'interval', 0.0001)
+        client = Client(
+            HTTP_AUTHORIZATION=f'Bearer {token_admin["access"]}'
+        )
+        client.get('/api/v1/genres/')
+        for _ in range(50):
+            client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        response = admin_client.get(PROFILES_URL)
+        assert response.status_code == 200
+        profiles = {
+            (profile['route'], profile['action']): profile
+            for profile in response.json()
+        }
+        assert list(profiles) == [('api/v1/titles/', 'list')], (
+            'Проверьте, что профилируются только выбранные запросы '
+            'и профили группируются по маршруту и действию'
+        )
+        assert profiles[('api/v1/titles/', 'list')]['requests'] == 50
+        response = admin_client.get(
+            PROFILES_URL, {'route': 'api/v1/titles/', 'action': 'list'}
+        )
+        assert response.status_code == 200
+        lines = response.content.decode().splitlines()
+        assert lines, 'Проверьте, что профиль содержит стеки'
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            assert int(count) > 0 and ';' in stack, (
+                'Проверьте, что профиль выгружается в свёрнутом формате'
+            )
+        assert admin_client.get(
+            PROFILES_URL, {'route': 'api/v1/genres/', 'action': 'list'}
+        ).status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_admin_only(self, user_client):
+        assert user_client.get(PROFILES_URL).status_code == 403
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_header_restricted(self, admin_client, user_client,
+                                  monkeypatch):
+        from api import middleware
+
+        assert admin_client.delete(PROFILES_URL).status_code == 204
+        monkeypatch.setattr(middleware, 'PROFILING', True)
+        monkeypatch.setattr(middleware, 'PROFILE_SAMPLE_RATE', 0)
+        monkeypatch.setattr(middleware, 'PROFILE_SECRET', 'secret')
+        user_client.get('/api/v1/titles/', HTTP_X_PROFILE='1')
+        Client().get('/api/v1/titles/', HTTP_X_PROFILE='wrong')
+        Client().get('/api/v1/titles/', HTTP_X_PROFILE='1',
+                     HTTP_AUTHORIZATION='Bearer invalid')
+        assert admin_client.get(PROFILES_URL).json() == [], (
+            f'Проверьте, что заголовок `{middleware.PROFILE_HEADER}` '
+            'не действует для обычных пользователей и анонимов'
+        )
+        Client().get('/api/v1/genres/', HTTP_X_PROFILE='secret')
+        profiles = admin_client.get(PROFILES_URL).json()
+        assert [profile['route'] for profile in profiles] == [
+            'api/v1/genres/'
+        ], (
+            'Проверьте, что заголовок со значением PROFILE_SECRET '
+            'включает профилирование'
+        )
@@ -0,0 +1,94 @@
+import multiprocessing
+
+import pytest
+
+METRICS_URL = '/metrics'
+
+
+def read_metrics(client):
+    response = client.get(METRICS_URL)
+    assert response.status_code == 200, (
+        f'Проверьте, что `{METRICS_URL}` доступен локальному сборщику'
+    )
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.content.decode().splitlines():
+        if line and not line.startswith('#'):
+            key, value = line.rsplit(' ', 1)
+            samples[key] = float(value)
+    return samples
+
+
+def write_in_child(directory):
+    from api.metrics import MmapStore
+    store = MmapStore(directory)
+    store.add('yamdb_http_requests_total{view="titles-list"}', 3)
+    store.add('yamdb_http_requests_in_flight', 1)
+
+
+class Test19Metrics:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_request_metrics(self, client):
+        requests = (
+            'yamdb_http_requests_total'
+            '{view="titles-list",action="list",status="200"}'
+        )
+        count = (
+            'yamdb_http_request_duration_seconds_count'
+            '{view="titles-list",action="list"}'
+        )
+        infinite = (
+            'yamdb_http_request_duration_seconds_bucket'
+            '{view="titles-list",action="list",le="+Inf"}'
+        )
+        queries = 'yamdb_db_queries_total{view="titles-list",action="list"}'
+        facets_hit = 'yamdb_cache_requests_total{cache="facets",result="hit"}'
+        before = read_metrics(client)
+        client.get('/api/v1/titles/', {'facets': 1})
+        client.get('/api/v1/titles/', {'facets': 1})
+        after = read_metrics(client)
+        assert after[requests] - before.get(requests, 0) == 2, (
+            'Проверьте, что запросы считаются по view, action и статусу'
+        )
+        assert after[count] - before.get(count, 0) == 2
+        assert after[infinite] == after[count], (
+            'Проверьте, что корзина +Inf гистограммы равна числу запросов'
+        )
+        assert after[queries] > before.get(queries, 0), (
+            'Проверьте, что считаются SQL-запросы'
+        )
+        assert after[facets_hit] - before.get(facets_hit, 0) >= 1, (
+            'Проверьте, что считаются попадания в кэш фасетов'
+        )
+        assert 'yamdb_http_requests_in_flight' in after
+
+    def test_02_processes_aggregated(self, tmp_path):
+        from api.metrics import MmapStore, collect
+
+        store = MmapStore(str(tmp_path))
+        store.add('yamdb_http_requests_total{view="titles-list"}', 2)
+        store.add('yamdb_http_requests_in_flight', 1)
+        child = multiprocessing.get_context('fork').Process(
+            target=write_in_child, args=(str(tmp_path),)
+        )
+        child.start()
+        child.join()
+        totals = collect(str(tmp_path))
+        assert totals['yamdb_http_requests_total{view="titles-list"}'] == 5, (
+            'Проверьте, что счётчики суммируются по процессам'
+        )
+        assert totals['yamdb_http_requests_in_flight'] == 1, (
+            'Проверьте, что gauge завершённых процессов не учитываются'
+        )
+        assert not (tmp_path / f'{child.pid}.db').exists(), (
+            'Проверьте, что файл завершённого процесса сливается '
+            'в общий файл и удаляется'
+        )
+        assert collect(str(tmp_path)) == totals, (
+            'Проверьте, что слитые счётчики не учитываются повторно'
+        )
+
+    def test_03_local_only(self, client):
+        response = client.get(METRICS_URL, REMOTE_ADDR='10.0.0.1')
+        assert response.status_code == 403
@@ -0,0 +1,150 @@
+import multiprocessing
+
+import pytest
+from django.db import connection
+
+USERS_TABLE = 'reviews_customuser'
+
+
+class UsersQueries:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if USERS_TABLE in sql:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def count_users_queries(client, url):
+    queries = UsersQueries()
+    with connection.execute_wrapper(queries):
+        response = client.get(url)
+    return response, queries.count
+
+
+class Test20UserCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_cached_user(self, user_client):
+        url = '/api/v1/titles/'
+        response, _ = count_users_queries(user_client, url)
+        assert response.status_code == 200
+        response, count = count_users_queries(user_client, url)
+        assert response.status_code == 200
+        assert count == 0, (
+            'Проверьте, что аутентифицированный запрос берёт пользователя '
+            'из кэша, а не из БД'
+        )
+        response, _ = count_users_queries(user_client, '/api/v1/users/me/')
+        assert response.json()['username'] == 'TestUser'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_role_change_invalidates(self, admin_client, user_client,
+                                        user):
+        url = '/api/v1/users/'
+        assert user_client.get(url).status_code == 403
+        response = admin_client.patch(f'{url}{user.username}/',
+                                      data={'role': 'admin'})
+        assert response.status_code == 200
+        assert user_client.get(url).status_code == 200, (
+            'Проверьте, что смена роли через `/api/v1/users/` '
+            'сбрасывает пользователя в кэше'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_deactivation_invalidates(self, user_client, user):
+        url = '/api/v1/users/me/'
+        assert user_client.get(url).status_code == 200
+        user.is_active = False
+        user.save()
+        assert user_client.get(url).status_code == 401, (
+            'Проверьте, что заблокированный пользователь не '
+            'аутентифицируется из кэша'
+        )
+        user.delete()
+        assert user_client.get(url).status_code == 401
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_invalidation_from_other_process(self, user_client, user):
+        from reviews.models import CustomUser
+        from reviews.user_cache import invalidate_user
+
+        url = '/api/v1/users/me/'
+        assert user_client.get(url).status_code == 200
+        CustomUser.objects.filter(pk=user.pk).update(is_active=False)
+        assert user_client.get(url).status_code == 200
+        process = multiprocessing.get_context('fork').Process(
+            target=invalidate_user, args=(user.pk,)
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        assert user_client.get(url).status_code == 401, (
+            'Проверьте, что пользователь хранится в кэше, общем для '
+            'процессов, и сброс в одном процессе виден в остальных'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_invalidation_after_commit(self, user, monkeypatch):
+        from django.db import transaction
+
+        from api_yamdb.cache import shared_cache
+        from reviews.models import CustomUser
+        from reviews.user_cache import (cache_user, get_cached_user,
+                                        get_token_version, token_version_key)
+        from reviews.usernames import usernames
+
+        monkeypatch.setattr('reviews.usernames.USERNAME_CACHE_TIMEOUT', 60)
+        usernames.clear()
+        with transaction.atomic():
+            user.role = 'admin'
+            user.username = 'renamed'
+            user.save()
+            # параллельный запрос прочитал строку до фиксации
+            cache_user(CustomUser(pk=user.pk, username='TestUser',
+                                  role='user'))
+            shared_cache().set(token_version_key(user.pk), 0)
+            usernames.get_many([])
+            usernames.entries[user.pk] = ('TestUser', float('inf'))
+        assert get_cached_user(user.pk) is None, (
+            'Проверьте, что кэш пользователя сбрасывается ещё раз '
+            'после фиксации транзакции'
+        )
+        assert get_token_version(user.pk) == 1, (
+            'Проверьте, что версия прав сбрасывается после фиксации'
+        )
+        assert usernames.get_many([user.pk]) == {user.pk: 'renamed'}, (
+            'Проверьте, что имя пользователя сбрасывается после фиксации'
+        )
+        usernames.clear()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_cached_fields(self, user_client, user):
+        from api_yamdb.cache import shared_cache
+        from reviews.user_cache import user_cache_key
+
+        assert user_client.get('/api/v1/users/me/').status_code == 200
+        fields = shared_cache().get(user_cache_key(user.pk))
+        assert fields == {
+            'id': user.pk, 'username': 'TestUser', 'role': 'user',
+            'is_staff': False, 'is_superuser': False, 'is_active': True,
+        }, (
+            'Проверьте, что в общем кэше хранятся только поля для проверки '
+            'прав, без пароля и личных данных'
+        )
+        response = user_client.get('/api/v1/users/me/')
+        assert response.json()['email'] == user.email
+
+    def test_07_cache_dir_checked(self, tmp_path):
+        from django.core.exceptions import ImproperlyConfigured
+
+        from api_yamdb.cache import SharedFileCache
+
+        directory = tmp_path / 'cache'
+        directory.mkdir(mode=0o700)
+        SharedFileCache(str(directory), {})
+        directory.chmod(0o755)
+        with pytest.raises(ImproperlyConfigured):
+            SharedFileCache(str(directory), {})
@@ -0,0 +1,110 @@
+import multiprocessing
+
+import pytest
+from django.db import connection
+from django.db.models import F
+from rest_framework.test import APIClient
+
+from .test_20_user_cache import UsersQueries
+
+
+def claims_client(user, monkeypatch):
+    from api import authentication
+    from api.views import get_tokens_for_user
+
+    monkeypatch.setattr(authentication, 'TOKEN_ROLE_CLAIMS', True)
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {get_tokens_for_user(user)["token"]}'
+    )
+    return client
+
+
+class Test21TokenClaims:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_no_users_queries(self, user, admin_client, monkeypatch):
+        from .common import create_titles
+
+        titles, _, _ = create_titles(admin_client)
+        client = claims_client(user, monkeypatch)
+        assert client.get('/api/v1/titles/').status_code == 200
+        queries = UsersQueries()
+        with connection.execute_wrapper(queries):
+            response = client.post(
+                f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+                data={'text': 'Отзыв', 'score': 7}
+            )
+            assert response.status_code == 201
+            assert response.json()['author'] == user.username
+            response = client.delete(
+                f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+                f'{response.json()["id"]}/'
+            )
+            assert response.status_code == 204
+        assert queries.count == 0, (
+            'Проверьте, что с ролью в токене запись и проверка прав '
+            'не обращаются к таблице пользователей'
+        )
+        response = client.get('/api/v1/users/me/')
+        assert response.json()['email'] == user.email, (
+            'Проверьте, что `/users/me/` отдаёт пользователя из БД'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_demotion(self, admin, monkeypatch):
+        client = claims_client(admin, monkeypatch)
+        url = '/api/v1/genres/'
+        response = client.post(url, data={'name': 'Ужасы', 'slug': 'horror'})
+        assert response.status_code == 201
+        admin.role = 'user'
+        admin.save()
+        response = client.post(url, data={'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 403, (
+            'Проверьте, что после смены роли токен со старой ролью '
+            'не даёт прав администратора'
+        )
+        admin.bio = 'Другая биография'
+        admin.save()
+        admin.refresh_from_db()
+        assert admin.token_version == 1, (
+            'Проверьте, что версия прав меняется только вместе с ролью'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_demotion_from_other_process(self, admin, monkeypatch):
+        from reviews import user_cache
+        from reviews.models import CustomUser
+
+        monkeypatch.setattr(user_cache, 'USER_CACHE_TIMEOUT', 0)
+        client = claims_client(admin, monkeypatch)
+        url = '/api/v1/genres/'
+        client.post(url, data={'name': 'Ужасы', 'slug': 'horror'})
+        queries = UsersQueries()
+        with connection.execute_wrapper(queries):
+            response = client.post(url, data={'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 201
+        assert queries.count == 0, (
+            'Проверьте, что версия прав берётся из общего кэша и при '
+            'отключённом кэше пользователей'
+        )
+        CustomUser.objects.filter(pk=admin.pk).update(
+            role='user', token_version=F('token_version') + 1
+        )
+        process = multiprocessing.get_context('fork').Process(
+            target=user_cache.invalidate_user, args=(admin.pk,)
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        response = client.post(url, data={'name': 'Комедия', 'slug': 'comedy'})
+        assert response.status_code == 403, (
+            'Проверьте, что версия прав хранится в кэше, общем для '
+            'процессов, и понижение роли в одном процессе видно в остальных'
+        )
+
+    def test_04_claims_user_not_saved(self):
+        from reviews.models import ClaimsUser
+
+        with pytest.raises(TypeError):
+            ClaimsUser(pk=1, username='user', role='user').save()
@@ -0,0 +1,159 @@
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import FAILED, PENDING, SENT, EmailOutbox
+from reviews.outbox import enqueue_email, send_pending
+
+
+class FailingConnection:
+
+    def __init__(self):
+        self.reconnects = 0
+
+    def send_messages(self, messages):
+        raise OSError('Connection refused')
+
+    def open(self):
+        self.reconnects += 1
+
+    def close(self):
+        pass
+
+
+class FlakyConnection:
+    """Отправляет первое письмо, затем сервер перестаёт отвечать."""
+
+    def __init__(self, open_errors=0):
+        self.open_errors = open_errors
+        self.sent = []
+
+    def send_messages(self, messages):
+        if self.sent:
+            raise OSError('Connection reset')
+        self.sent.extend(messages)
+        return len(messages)
+
+    def open(self):
+        if self.open_errors:
+            self.open_errors -= 1
+            raise OSError('Connection refused')
+
+    def close(self):
+        pass
+
+
+class Stop(Exception):
+    pass
+
+
+class Test22EmailOutbox:
+    url_signup = '/api/v1/auth/signup/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_deduplicated(self, client):
+        data = {'email': 'outbox@yamdb.fake', 'username': 'outbox'}
+        outbox_before_count = len(mail.outbox)
+        for _ in range(3):
+            response = client.post(self.url_signup, data=data)
+            assert response.status_code == 200
+        assert len(mail.outbox) == outbox_before_count, (
+            'Проверьте, что регистрация не отправляет письмо в запросе, '
+            'а ставит его в очередь'
+        )
+        pending = EmailOutbox.objects.filter(
+            recipient=data['email'], status=PENDING
+        )
+        assert pending.count() == 1, (
+            'Проверьте, что повторная регистрация заменяет письмо в очереди, '
+            'а не добавляет новое'
+        )
+        assert pending.get().version == 2
+
+        call_command('send_outbox', '--once', verbosity=0)
+        assert len(mail.outbox) == outbox_before_count + 1
+        code = mail.outbox[-1].body.split()[-1]
+        response = client.post(
+            '/api/v1/auth/token/',
+            data={'username': data['username'], 'confirmation_code': code}
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что в письме отправляется последний код подтверждения'
+        )
+        assert EmailOutbox.objects.get().status == SENT
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_batches(self):
+        for number in range(5):
+            enqueue_email('test', f'user{number}@yamdb.fake', 'subject', 'body')
+        outbox_before_count = len(mail.outbox)
+        call_command('send_outbox', '--once', '--batch-size', '2',
+                     verbosity=0)
+        assert len(mail.outbox) == outbox_before_count + 5
+        assert EmailOutbox.objects.filter(status=SENT).count() == 5
+        assert all(email.sent_at for email in EmailOutbox.objects.all())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_retry_and_fail(self):
+        enqueue_email('test', 'retry@yamdb.fake', 'subject', 'body')
+        connection = FailingConnection()
+        assert send_pending(connection, 10, max_attempts=2) == 1
+        email = EmailOutbox.objects.get()
+        assert email.status == PENDING
+        assert email.attempts == 1
+        assert email.last_error == 'Connection refused'
+        assert email.send_after > timezone.now(), (
+            'Проверьте, что повторная отправка откладывается'
+        )
+        assert connection.reconnects == 1
+        assert send_pending(connection, 10, max_attempts=2) == 0
+
+        EmailOutbox.objects.update(send_after=timezone.now())
+        send_pending(connection, 10, max_attempts=2)
+        email.refresh_from_db()
+        assert email.status == FAILED, (
+            'Проверьте, что после исчерпания попыток письмо помечается '
+            'как неотправленное'
+        )
+        assert email.attempts == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_sent_marked_when_reconnect_fails(self):
+        for number in range(2):
+            enqueue_email('test', f'user{number}@yamdb.fake', 'subject', 'body')
+        connection = FlakyConnection(open_errors=1)
+        with pytest.raises(OSError):
+            send_pending(connection, 10)
+        assert EmailOutbox.objects.filter(status=SENT).count() == 1, (
+            'Проверьте, что отправленные письма отмечаются, даже если '
+            'соединение не удалось открыть заново'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_worker_retries_connection(self, monkeypatch):
+        enqueue_email('test', 'worker@yamdb.fake', 'subject', 'body')
+        connection = FlakyConnection(open_errors=2)
+        pauses = []
+
+        def sleep(seconds):
+            pauses.append(seconds)
+            if len(pauses) == 3:
+                raise Stop
+
+        monkeypatch.setattr(
+            'reviews.management.commands.send_outbox.get_connection',
+            lambda: connection
+        )
+        monkeypatch.setattr(
+            'reviews.management.commands.send_outbox.time.sleep', sleep
+        )
+        with pytest.raises(Stop):
+            call_command('send_outbox', '--interval', '1', verbosity=0)
+        assert EmailOutbox.objects.get().status == SENT, (
+            'Проверьте, что `send_outbox` повторяет подключение, если '
+            'почтовый сервер недоступен при запуске'
+        )
+        assert pauses == [1, 2, 1], (
+            'Проверьте, что пауза между повторами подключения удваивается'
+        )
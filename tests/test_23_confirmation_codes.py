@@ -0,0 +1,114 @@
+import multiprocessing
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from api_yamdb.cache import shared_cache
+from reviews.confirmation_codes import CacheCodeStore
+from reviews.models import ConfirmationCode
+
+USERS_TABLE = 'reviews_customuser'
+
+
+class UsersWrites:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if USERS_TABLE in sql and not sql.lstrip().upper().startswith(
+            'SELECT'
+        ):
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def check_code(args):
+    return CacheCodeStore().check(*args)
+
+
+class Test23ConfirmationCodes:
+    url_signup = '/api/v1/auth/signup/'
+    url_token = '/api/v1/auth/token/'
+    data = {'email': 'code@yamdb.fake', 'username': 'code'}
+
+    def signup(self, client):
+        response = client.post(self.url_signup, data=self.data)
+        assert response.status_code == 200
+        call_command('send_outbox', '--once', verbosity=0)
+        return int(mail.outbox[-1].body.split()[-1])
+
+    def token(self, client, code):
+        return client.post(self.url_token, data={
+            'username': self.data['username'], 'confirmation_code': code
+        })
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_no_user_writes(self, client):
+        code = self.signup(client)
+        writes = UsersWrites()
+        with connection.execute_wrapper(writes):
+            assert self.token(client, code + 1).status_code == 400
+            assert self.token(client, code).status_code == 200
+        assert writes.count == 0, (
+            'Проверьте, что получение токена не изменяет строку пользователя'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_attempts_and_expiry(self, client, monkeypatch):
+        monkeypatch.setattr(
+            'reviews.confirmation_codes.CONFIRMATION_CODE_MAX_ATTEMPTS', 2
+        )
+        code = self.signup(client)
+        for _ in range(2):
+            assert self.token(client, code + 1).status_code == 400
+        assert self.token(client, code).status_code == 400, (
+            'Проверьте, что после исчерпания попыток код не принимается'
+        )
+
+        code = self.signup(client)
+        assert self.token(client, code).status_code == 200, (
+            'Проверьте, что повторная регистрация выдаёт новый код'
+        )
+        ConfirmationCode.objects.update(expires_at=timezone.now())
+        assert self.token(client, code).status_code == 400, (
+            'Проверьте, что просроченный код не принимается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cache_store(self, client, monkeypatch):
+        monkeypatch.setattr(
+            'reviews.confirmation_codes.CONFIRMATION_CODE_STORE', 'cache'
+        )
+        monkeypatch.setattr(
+            'reviews.confirmation_codes.CONFIRMATION_CODE_MAX_ATTEMPTS', 2
+        )
+        shared_cache().clear()
+        code = self.signup(client)
+        assert not ConfirmationCode.objects.exists()
+        assert self.token(client, code).status_code == 200
+        for _ in range(2):
+            assert self.token(client, code + 1).status_code == 400
+        assert self.token(client, code).status_code == 400, (
+            'Проверьте, что после исчерпания попыток код не принимается'
+        )
+
+    def test_04_cache_store_across_processes(self, monkeypatch):
+        monkeypatch.setattr(
+            'reviews.confirmation_codes.CONFIRMATION_CODE_MAX_ATTEMPTS', 3
+        )
+        with multiprocessing.get_context('fork').Pool(1) as pool:
+            code = pool.apply(CacheCodeStore().issue, (1,))
+        assert CacheCodeStore().check(1, code), (
+            'Проверьте, что код из кэша, выданный одним процессом, '
+            'принимается в другом'
+        )
+        with multiprocessing.get_context('fork').Pool(8) as pool:
+            accepted = sum(pool.map(check_code, [(1, code)] * 8))
+        assert accepted == 2, (
+            'Проверьте, что попытки считаются атомарно и параллельные '
+            'процессы вместе не превышают лимит'
+        )
@@ -0,0 +1,159 @@
+import multiprocessing
+
+import pytest
+from django.db import connection
+
+from api.middleware import QueryCounter
+from api.throttling import WriteThrottle
+from api_yamdb.cache import shared_cache
+
+from .common import create_titles
+
+
+class WriteRequest:
+    method = 'POST'
+
+    class user:
+        pk = 1
+
+
+def allow_many(requests):
+    throttle = WriteThrottle()
+    return sum(
+        throttle.allow_request(WriteRequest, None) for _ in range(requests)
+    )
+
+
+def post_counted(client, url, data):
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        response = client.post(url, data=data)
+    return response, queries.count
+
+
+class Test24Throttling:
+    url_signup = '/api/v1/auth/signup/'
+    url_token = '/api/v1/auth/token/'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_auth_username(self, client, monkeypatch):
+        monkeypatch.setattr('api.throttling.THROTTLE_RATES', {
+            'auth_address': '100/min', 'auth_username': '3/min'
+        })
+        client.post(self.url_signup, data={
+            'email': 'throttle@yamdb.fake', 'username': 'throttle'
+        })
+        data = {'username': 'throttle', 'confirmation_code': 1}
+        for _ in range(2):
+            assert client.post(self.url_token, data=data).status_code == 400
+        response, queries = post_counted(client, self.url_token, data)
+        assert response.status_code == 429, (
+            f'Проверьте, что `{self.url_token}` ограничивает число попыток '
+            'для одного имени пользователя'
+        )
+        assert int(response['Retry-After']) > 0, (
+            'Проверьте, что ответ 429 содержит заголовок Retry-After'
+        )
+        assert queries == 0, (
+            'Проверьте, что отклонённый запрос не обращается к БД'
+        )
+        other = {'username': 'other', 'confirmation_code': 1}
+        assert client.post(self.url_token, data=other).status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_auth_address(self, client, monkeypatch):
+        monkeypatch.setattr('api.throttling.THROTTLE_RATES', {
+            'auth_address': '2/min', 'auth_username': '100/min'
+        })
+        for number in range(2):
+            response = client.post(self.url_signup, data={
+                'email': f'user{number}@yamdb.fake',
+                'username': f'user{number}',
+            })
+            assert response.status_code == 200
+        response = client.post(self.url_signup, data={
+            'email': 'user2@yamdb.fake', 'username': 'user2'
+        })
+        assert response.status_code == 429, (
+            f'Проверьте, что `{self.url_signup}` ограничивает число '
+            'запросов с одного адреса'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_writes(self, admin_client, user_client, monkeypatch):
+        titles, _, _ = create_titles(admin_client)
+        monkeypatch.setattr('api.throttling.THROTTLE_RATES', {
+            'write_user': '2/min'
+        })
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        data = {'text': 'Отзыв', 'score': 5}
+        assert user_client.post(url, data=data).status_code == 201
+        assert user_client.post(url, data=data).status_code == 400
+        response, queries = post_counted(user_client, url, data)
+        assert response.status_code == 429, (
+            'Проверьте, что создание отзывов ограничено для пользователя'
+        )
+        assert queries == 0, (
+            'Проверьте, что отклонённый запрос не обращается к БД'
+        )
+        assert user_client.get(url).status_code == 200, (
+            'Проверьте, что чтение отзывов не ограничивается'
+        )
+        assert admin_client.post(url, data=data).status_code == 201, (
+            'Проверьте, что лимит считается отдельно для каждого пользователя'
+        )
+
+    def test_04_sliding_window(self, monkeypatch):
+        class Request:
+            method = 'POST'
+
+            class user:
+                pk = 1
+
+        monkeypatch.setattr('api.throttling.THROTTLE_RATES', {
+            'write_user': '4/min'
+        })
+        now = 590.0
+        monkeypatch.setattr('api.throttling.time.time', lambda: now)
+        throttle = WriteThrottle()
+        for _ in range(4):
+            assert throttle.allow_request(Request, None)
+        assert not throttle.allow_request(Request, None)
+        assert throttle.wait() == 10, (
+            'Проверьте, что Retry-After указывает время до конца окна'
+        )
+
+        now = 630.0
+        allowed = 0
+        while throttle.allow_request(Request, None):
+            allowed += 1
+        assert allowed == 2, (
+            'Проверьте, что запросы предыдущего окна учитываются '
+            'пропорционально непрошедшей части текущего'
+        )
+        now = 645.0
+        assert throttle.allow_request(Request, None)
+        assert not throttle.allow_request(Request, None)
+        shared_cache().clear()
+
+    def test_05_concurrent_processes(self, monkeypatch):
+        monkeypatch.setattr('api.throttling.THROTTLE_RATES', {
+            'write_user': '20/min'
+        })
+        monkeypatch.setattr('api.throttling.time.time', lambda: 590.0)
+        with multiprocessing.get_context('fork').Pool(8) as pool:
+            allowed = sum(pool.map(allow_many, [10] * 8))
+        assert allowed == 20, (
+            'Проверьте, что счётчики увеличиваются атомарно и параллельные '
+            'процессы вместе не превышают лимит'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_json_array(self, client):
+        for url in (self.url_signup, self.url_token):
+            response = client.post(
+                url, data='[]', content_type='application/json'
+            )
+            assert response.status_code == 400, (
+                f'Проверьте, что `{url}` отвечает 400 на тело-массив JSON'
+            )
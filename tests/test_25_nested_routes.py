@@ -0,0 +1,109 @@
+import pytest
+from django.db import connection
+
+from .common import create_comments
+
+
+class Statements:
+
+    def __init__(self):
+        self.sql = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.sql.append(sql)
+        return execute(sql, params, many, context)
+
+    def on(self, table, verb='SELECT'):
+        return [
+            sql for sql in self.sql
+            if sql.startswith(verb) and f'"{table}"' in sql
+        ]
+
+
+def request_statements(method, url, data=None):
+    statements = Statements()
+    with connection.execute_wrapper(statements):
+        response = method(url, data=data)
+    return response, statements
+
+
+class Test25NestedRoutes:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_review_create(self, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[1]["id"]}/reviews/'
+        data = {'text': 'Новый отзыв', 'score': 7}
+        response, statements = request_statements(admin_client.post, url, data)
+        assert response.status_code == 201
+        assert len(statements.on('reviews_title')) == 1, (
+            'Проверьте, что при создании отзыва произведение '
+            'запрашивается один раз'
+        )
+        assert not statements.on('reviews_review'), (
+            'Проверьте, что повторный отзыв отсекает ограничение '
+            'unique_review, а не отдельный запрос'
+        )
+        response, _ = request_statements(admin_client.post, url, data)
+        assert response.status_code == 400
+        assert response.json() == {
+            'non_field_errors': ['Один автор - один отзыв!']
+        }
+        response, _ = request_statements(
+            admin_client.post, '/api/v1/titles/0/reviews/', data
+        )
+        assert response.status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_comment_parent_chain(self, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        review = reviews[0]['id']
+        comment = comments[0]['id']
+        right = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review}/comments/'
+        wrong = f'/api/v1/titles/{titles[1]["id"]}/reviews/{review}/comments/'
+
+        response, statements = request_statements(
+            admin_client.get, f'{right}{comment}/'
+        )
+        assert response.status_code == 200
+        assert statements.on('reviews_review') == statements.on(
+            'reviews_comment'
+        ) and len(statements.on('reviews_comment')) == 1, (
+            'Проверьте, что комментарий и его отзыв проверяются одним '
+            'запросом'
+        )
+        response, statements = request_statements(
+            admin_client.post, right, {'text': 'Комментарий'}
+        )
+        assert response.status_code == 201
+        assert len(statements.on('reviews_review')) == 1
+
+        for method, url, data in (
+            (admin_client.get, wrong, None),
+            (admin_client.get, f'{wrong}{comment}/', None),
+            (admin_client.post, wrong, {'text': 'Комментарий'}),
+        ):
+            response, _ = request_statements(method, url, data)
+            assert response.status_code == 404, (
+                'Проверьте, что отзыв другого произведения в URL '
+                'комментариев даёт 404'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_review_create_other_integrity_error(self, admin_client,
+                                                    admin, monkeypatch):
+        from django.db import IntegrityError
+
+        from reviews.models import Review
+
+        _, _, titles, _, _ = create_comments(admin_client, admin)
+
+        def save(*args, **kwargs):
+            raise IntegrityError('FOREIGN KEY constraint failed')
+
+        monkeypatch.setattr(Review, 'save', save)
+        with pytest.raises(IntegrityError):
+            admin_client.post(
+                f'/api/v1/titles/{titles[1]["id"]}/reviews/',
+                {'text': 'Новый отзыв', 'score': 7}
+            )
@@ -0,0 +1,96 @@
+import multiprocessing
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from reviews.models import Review, Title
+from reviews.usernames import usernames
+
+from .test_25_nested_routes import Statements
+
+User = get_user_model()
+
+
+def create_reviews(count):
+    title = Title.objects.create(name='Проект', year=2020)
+    for number in range(count):
+        author = User.objects.create(
+            username=f'author{number}', email=f'author{number}@yamdb.fake'
+        )
+        Review.objects.create(
+            title=title, author=author, text='Отзыв', score=5
+        )
+    return f'/api/v1/titles/{title.pk}/reviews/'
+
+
+def get_statements(client, url):
+    statements = Statements()
+    with connection.execute_wrapper(statements):
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.json(), statements.on('reviews_customuser')
+
+
+class Test26AuthorUsernames:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_joined_with_page(self, client):
+        url = create_reviews(12)
+        data, users = get_statements(client, url)
+        assert {review['author'] for review in data['results']} <= {
+            f'author{number}' for number in range(12)
+        }
+        assert len(data['results']) == 10
+        assert len(users) == 1 and 'reviews_review' in users[0], (
+            'Проверьте, что имена авторов загружаются в запросе страницы, '
+            'а не отдельно для каждого отзыва'
+        )
+        review = data['results'][0]
+        data, users = get_statements(client, f'{url}{review["id"]}/')
+        assert data['author'] == review['author']
+        assert len(users) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_cache(self, client, admin_client, monkeypatch):
+        monkeypatch.setattr('reviews.usernames.USERNAME_CACHE_TIMEOUT', 60)
+        usernames.clear()
+        url = create_reviews(3)
+        data, users = get_statements(client, url)
+        assert len(users) == 1 and 'reviews_review' not in users[0], (
+            'Проверьте, что при включённом кэше имена страницы '
+            'загружаются одним запросом'
+        )
+        data, users = get_statements(client, url)
+        assert not users, (
+            'Проверьте, что повторный запрос берёт имена из кэша'
+        )
+        response = admin_client.patch(
+            '/api/v1/users/author0/', data={'username': 'renamed'}
+        )
+        assert response.status_code == 200
+        data, _ = get_statements(client, url)
+        assert 'renamed' in {review['author'] for review in data['results']}, (
+            'Проверьте, что смена имени сбрасывает кэш имён'
+        )
+        usernames.clear()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_invalidation_from_other_process(self, client, monkeypatch):
+        monkeypatch.setattr('reviews.usernames.USERNAME_CACHE_TIMEOUT', 60)
+        usernames.clear()
+        url = create_reviews(3)
+        get_statements(client, url)
+        author = User.objects.get(username='author0')
+        User.objects.filter(pk=author.pk).update(username='renamed')
+        process = multiprocessing.get_context('fork').Process(
+            target=usernames.invalidate, args=(author.pk,)
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        data, _ = get_statements(client, url)
+        assert 'renamed' in {review['author'] for review in data['results']}, (
+            'Проверьте, что сброс имени в одном процессе виден в остальных'
+        )
+        usernames.clear()
@@ -0,0 +1,239 @@
+import re
+from itertools import count
+
+import pytest
+from django.db import connection
+from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.pagination import KeysetPagination
+from api.slow_queries import slow_query_log
+from api.urls import router_v1
+from reviews.confirmation_codes import code_store
+from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+
+PAGE_SIZES = (2, 10)
+DATASET_SIZES = (3, 15)
+
+# Наибольшее число SQL-команд на один запрос к API, включая SAVEPOINT.
+# Новый маршрут router_v1 должен появиться здесь, иначе тест упадёт
+BUDGETS = {
+    'categories list': 2,
+    'genres list': 2,
+    'titles list': 3,
+    'titles detail': 2,
+    'Reviews list': 3,
+    'Reviews detail': 1,
+    'Comments list': 3,
+    'Comments detail': 1,
+    'admin list': 2,
+    'admin detail': 1,
+    'users me': 1,
+    'titles create': 12,
+    'Reviews create': 6,
+    'Reviews update': 4,
+    'Reviews delete': 5,
+    'Comments create': 2,
+    'Comments update': 2,
+    'Comments delete': 2,
+    'auth signup': 15,
+    'auth token': 2,
+}
+
+# Списки без фильтров и сортировки по индексу, которым полный
+# просмотр таблицы не страшен
+FULL_SCANS_ALLOWED = {'categories list', 'genres list'}
+
+# Строка плана SQLite с полным просмотром таблицы (не индекса)
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?(?P<table>\w+)$')
+
+
+class Queries:
+
+    def __init__(self):
+        self.executed = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.executed.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def fill(size):
+    """Дополняет данные до size строк в каждой таблице; отзывы
+    и комментарии относятся к первому произведению и первому отзыву."""
+    for number in range(Category.objects.count(), size):
+        category = Category.objects.create(
+            name=f'Категория {number}', slug=f'category-{number}'
+        )
+        genre = Genre.objects.create(
+            name=f'Жанр {number}', slug=f'genre-{number}'
+        )
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000 + number,
+            category=category
+        )
+        title.genre.set([genre, Genre.objects.order_by('pk').first()])
+        author = CustomUser.objects.create(
+            username=f'author{number}', email=f'author{number}@yamdb.fake'
+        )
+        review = Review.objects.create(
+            title=Title.objects.order_by('pk').first(), author=author,
+            text='Отзыв', score=number % 10 + 1
+        )
+        Comment.objects.create(
+            review=Review.objects.order_by('pk').first() or review,
+            author=author, text='Комментарий'
+        )
+
+
+def write_endpoints(user, title, review, number):
+    """Создание, изменение и удаление отзывов и комментариев и создание
+    произведения; удаляются записи, созданные здесь же."""
+    genre = Genre.objects.order_by('pk').first()
+    target = Title.objects.create(
+        name=f'Новое произведение {number}', year=2000,
+        category=title.category
+    )
+    doomed_review = Review.objects.create(
+        title=target, author=CustomUser.objects.exclude(pk=user.pk).first(),
+        text='Отзыв', score=5
+    )
+    doomed_comment = Comment.objects.create(
+        review=review, author=user, text='Комментарий'
+    )
+    comment = Comment.objects.filter(review=review).order_by('pk').first()
+    reviews = f'/api/v1/titles/{title.pk}/reviews/'
+    comments = f'{reviews}{review.pk}/comments/'
+    return {
+        'titles create': ('post', '/api/v1/titles/', {
+            'name': f'Произведение {number}', 'year': 2000,
+            'genre': [genre.slug], 'category': title.category.slug,
+        }),
+        'Reviews create': (
+            'post', f'/api/v1/titles/{target.pk}/reviews/',
+            {'text': 'Отзыв', 'score': 7}
+        ),
+        'Reviews update': (
+            'patch', f'{reviews}{review.pk}/', {'score': review.score % 10 + 1}
+        ),
+        'Reviews delete': (
+            'delete',
+            f'/api/v1/titles/{target.pk}/reviews/{doomed_review.pk}/', None
+        ),
+        'Comments create': ('post', comments, {'text': 'Комментарий'}),
+        'Comments update': (
+            'patch', f'{comments}{comment.pk}/', {'text': f'Текст {number}'}
+        ),
+        'Comments delete': (
+            'delete', f'{comments}{doomed_comment.pk}/', None
+        ),
+    }
+
+
+def endpoints(user, numbers):
+    """{имя: (метод, адрес, данные)} для всех маршрутов router_v1,
+    изменения данных и аутентификации."""
+    title = Title.objects.order_by('pk').first()
+    review = Review.objects.filter(title=title).order_by('pk').first()
+    details = {
+        'titles': title.pk,
+        'Reviews': review.pk,
+        'Comments': Comment.objects.filter(review=review).first().pk,
+        'admin': 'author0',
+    }
+    result = {}
+    for prefix, _, basename in router_v1.registry:
+        path = prefix.replace(
+            r'(?P<title_id>\d+)', str(title.pk)
+        ).replace(r'(?P<review_id>\d+)', str(review.pk))
+        result[f'{basename} list'] = ('get', f'/api/v1/{path}/', None)
+        if basename in details:
+            result[f'{basename} detail'] = (
+                'get', f'/api/v1/{path}/{details[basename]}/', None
+            )
+    result.update(write_endpoints(user, title, review, next(numbers)))
+    result['users me'] = ('get', '/api/v1/users/me/', None)
+    number = next(numbers)
+    result['auth signup'] = ('post', '/api/v1/auth/signup/', {
+        'username': f'new{number}', 'email': f'new{number}@yamdb.fake'
+    })
+    result['auth token'] = ('post', '/api/v1/auth/token/', {
+        'username': user.username,
+        'confirmation_code': code_store().issue(user.pk),
+    })
+    return result
+
+
+def measure(user, monkeypatch):
+    """Число запросов по (размер данных, размер страницы) и планы
+    выполненных запросов по маршрутам."""
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+    )
+    client.get('/api/v1/users/me/')
+    numbers = count()
+    counts = {}
+    plans = {}
+    for size in DATASET_SIZES:
+        fill(size)
+        for page_size in PAGE_SIZES:
+            monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+            monkeypatch.setattr(KeysetPagination, 'page_size', page_size)
+            for name, (method, url, data) in endpoints(
+                user, numbers
+            ).items():
+                queries = Queries()
+                with connection.execute_wrapper(queries):
+                    response = getattr(client, method)(url, data)
+                assert status.is_success(response.status_code), (
+                    f'{method.upper()} `{url}` вернул {response.status_code}'
+                )
+                counts.setdefault(name, {})[size, page_size] = len(
+                    queries.executed
+                )
+                for sql, params in queries.executed:
+                    plans.setdefault(name, {})[sql] = slow_query_log.explain(
+                        connection, sql, params
+                    ) or []
+    return counts, plans
+
+
+class Test27QueryBudgets:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_query_counts(self, admin, monkeypatch):
+        counts, _ = measure(admin, monkeypatch)
+        for name, by_size in counts.items():
+            assert name in BUDGETS, (
+                f'Добавьте бюджет запросов для `{name}` в BUDGETS'
+            )
+            assert len(set(by_size.values())) == 1, (
+                f'Проверьте, что число SQL-запросов `{name}` не зависит '
+                f'от числа строк и размера страницы: {by_size}'
+            )
+            queries = next(iter(by_size.values()))
+            assert queries <= BUDGETS[name], (
+                f'`{name}` выполняет {queries} SQL-запросов, '
+                f'бюджет {BUDGETS[name]}'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_no_full_scans(self, admin, monkeypatch, record_property):
+        _, plans = measure(admin, monkeypatch)
+        for name, queries in plans.items():
+            record_property(name, '\n\n'.join(
+                '\n'.join([sql, *plan]) for sql, plan in queries.items()
+            ))
+            if name in FULL_SCANS_ALLOWED:
+                continue
+            for sql, plan in queries.items():
+                for line in plan:
+                    match = FULL_SCAN.search(line)
+                    assert match is None, (
+                        f'`{name}` просматривает таблицу '
+                        f'{match["table"]} целиком:\n{sql}\n'
+                        + '\n'.join(plan)
+                    )